@@ -0,0 +1,528 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# MOD-App
+# Copyright (C) 2014-2015 Filipe Coelho <falktx@falktx.com>
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 3 of
+# the License, or any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# For a full copy of the GNU General Public License see the LICENSE file.
+
+# ------------------------------------------------------------------------------------------------------------
+# Imports (Custom)
+
+from mod_common import *
+
+# ------------------------------------------------------------------------------------------------------------
+# Imports (Global)
+
+import re
+import time
+
+from threading import Condition
+
+if using_Qt4:
+    from PyQt4.QtCore import pyqtSignal, pyqtSlot, QObject, QProcess, QThread, QTimer
+    from PyQt4.QtNetwork import QTcpSocket
+else:
+    from PyQt5.QtCore import pyqtSignal, pyqtSlot, QObject, QProcess, QThread, QTimer
+    from PyQt5.QtNetwork import QTcpSocket
+
+# ------------------------------------------------------------------------------------------------------------
+# Backend Events
+
+BACKEND_EVENT_READY       = 1 # backend finished initializing, data is empty
+BACKEND_EVENT_XRUN        = 2 # audio dropout, data is the full line
+BACKEND_EVENT_PLUGIN_LOAD = 3 # plugin was added, data is its URI
+BACKEND_EVENT_ERROR       = 4 # something went wrong, data is the full line
+
+# ------------------------------------------------------------------------------------------------------------
+# Backend Event Parser, classifies mod-host output lines into events
+
+class BackendEventParser(object):
+    # lines that mean the backend is ready
+    READY_LINES = ("mod-host ready!", "mod-host is running.")
+
+    # terminal color codes, as used by mod-host
+    ANSI_ESCAPE = re.compile(r"\x1b\[[0-9;]*[A-Za-z]")
+    ANSI_RED    = "\x1b[0;31m"
+
+    XRUN        = re.compile(r"\bx-?run\b", re.IGNORECASE)
+    PLUGIN_LOAD = re.compile(r"\badd\s+(\S+:\S+)\s+\d+\s*$")
+    ERROR       = re.compile(r"^(error\b|failed to\b|could not\b)", re.IGNORECASE)
+
+    # raw lines that might be ready or error lines, for finding them quickly in output that can't be fully parsed
+    RAW_IMPORTANT = re.compile(rb"^(?:[^\n]*(?:mod-host ready!|mod-host is running\.|\x1b\[0;31m)|"
+                               rb"(?:\x1b\[[0-9;]*[A-Za-z]|[ \t])*(?:error\b|failed to\b|could not\b))[^\n]*$",
+                               re.IGNORECASE | re.MULTILINE)
+
+    # Returns the lines of @a data that may have a ready or error event, still to be parsed
+    def findImportantLines(self, data):
+        return self.RAW_IMPORTANT.findall(data)
+
+    # Returns the line without color codes and its event as (type, data), or None if it's just a regular line
+    def parse(self, rawLine):
+        line = self.ANSI_ESCAPE.sub("", rawLine).strip()
+
+        if not line:
+            return (line, None)
+
+        if line in self.READY_LINES:
+            return (line, (BACKEND_EVENT_READY, ""))
+
+        if self.ANSI_RED in rawLine or self.ERROR.match(line) is not None:
+            return (line, (BACKEND_EVENT_ERROR, line))
+
+        if self.XRUN.search(line) is not None:
+            return (line, (BACKEND_EVENT_XRUN, line))
+
+        match = self.PLUGIN_LOAD.search(line)
+        if match is not None:
+            return (line, (BACKEND_EVENT_PLUGIN_LOAD, match.group(1)))
+
+        return (line, None)
+
+# ------------------------------------------------------------------------------------------------------------
+# Backend Log Reader
+#
+# Receives raw output from the backend process and splits it into lines on its own thread,
+# so a verbose backend doesn't stall the GUI. Events found in the output are dispatched as signals.
+# Data is queued as-is and every line of it is checked for events. If the backend is faster than the log,
+# only the last lines of each batch are printed, the others are dropped (and reported as such).
+# If the queue gets too big, more data is dropped right away except for its ready and error lines.
+
+class BackendLogReader(QThread):
+    # signals
+    backendReady        = pyqtSignal()
+    backendXRun         = pyqtSignal(str)
+    backendPluginLoaded = pyqtSignal(str)
+    backendError        = pyqtSignal(str)
+
+    # maximum number of chunks waiting to be parsed, more data is appended to the last one
+    MAX_PENDING_CHUNKS = 256
+
+    # maximum size of the data waiting to be parsed, and of the error lines kept from the data dropped after that
+    MAX_PENDING_BYTES  = 4*1024*1024
+    MAX_OVERFLOW_LINES = 256
+
+    # maximum number of lines printed per batch
+    MAX_LOGGED_LINES = 1000
+
+    # a line longer than this without a newline is flushed as-is
+    MAX_LINE_LENGTH = 64*1024
+
+    def __init__(self, parent):
+        QThread.__init__(self, parent)
+
+        self.fCondition = Condition()
+        self.fChunks    = []
+        self.fSize      = 0     # size of all chunks
+        self.fDropped   = 0     # bytes dropped
+        self.fOverflow  = []    # ready and error lines of the dropped data
+        self.fStopping  = False
+        self.fVerbose   = False
+        self.fParser    = BackendEventParser()
+
+        # only touched by the reader thread
+        self.fPartialLine = b""
+        self.fLastLine    = ""
+        self.fRepeatCount = 0
+
+    def setVerbose(self, verbose):
+        self.fVerbose = verbose
+
+    # Queue raw backend output, called from the GUI thread
+    def feed(self, data):
+        if not data:
+            return
+
+        with self.fCondition:
+            if self.fSize + len(data) > self.MAX_PENDING_BYTES:
+                # the ready and error lines must still be found
+                self.fDropped += len(data)
+                self.fOverflow.extend(self.fParser.findImportantLines(data))
+
+                if len(self.fOverflow) > self.MAX_OVERFLOW_LINES:
+                    self.fOverflow = self.keepReadyLines(self.fOverflow)
+
+            elif len(self.fChunks) >= self.MAX_PENDING_CHUNKS:
+                # bytearray, so appending doesn't copy everything each time
+                if not isinstance(self.fChunks[-1], bytearray):
+                    self.fChunks[-1] = bytearray(self.fChunks[-1])
+
+                self.fChunks[-1] += data
+                self.fSize += len(data)
+
+            else:
+                self.fChunks.append(data)
+                self.fSize += len(data)
+
+            self.fCondition.notify()
+
+    # Trim @a lines to MAX_OVERFLOW_LINES, keeping the ready lines and the last error lines
+    def keepReadyLines(self, lines):
+        ready = [line for line in lines if b"mod-host" in line]
+        other = [line for line in lines if b"mod-host" not in line]
+
+        return ready + other[len(ready)-self.MAX_OVERFLOW_LINES:]
+
+    def stopWait(self):
+        with self.fCondition:
+            self.fStopping = True
+            self.fCondition.notify()
+
+        return self.wait()
+
+    def run(self):
+        while True:
+            with self.fCondition:
+                while not (self.fChunks or self.fDropped or self.fStopping):
+                    self.fCondition.wait()
+
+                if self.fStopping:
+                    return
+
+                chunks   = self.fChunks
+                dropped  = self.fDropped
+                overflow = self.fOverflow
+                self.fChunks   = []
+                self.fSize     = 0
+                self.fDropped  = 0
+                self.fOverflow = []
+
+            self.parseChunks(chunks)
+
+            if dropped:
+                # whatever was before the dropped data is not part of the next line
+                self.fPartialLine = b""
+                self.handleDropped("%i bytes" % dropped)
+
+                for rawLine in overflow:
+                    line, event = self.fParser.parse(str(rawLine, encoding="utf-8", errors="ignore"))
+
+                    if event is not None:
+                        self.dispatchEvent(event)
+
+                    if line:
+                        self.handleLine(line)
+
+            self.flushRepeats()
+
+    def parseChunks(self, chunks):
+        if not chunks:
+            return
+
+        data  = self.fPartialLine + b"".join(chunks)
+        lines = data.split(b"\n")
+
+        self.fPartialLine = lines.pop()
+
+        if len(self.fPartialLine) > self.MAX_LINE_LENGTH:
+            lines.append(self.fPartialLine)
+            self.fPartialLine = b""
+
+        # lines before these are only checked for events
+        firstLogged = len(lines) - self.MAX_LOGGED_LINES
+
+        if firstLogged > 0:
+            self.handleDropped("%i lines" % firstLogged)
+
+        for i in range(len(lines)):
+            line, event = self.fParser.parse(str(lines[i], encoding="utf-8", errors="ignore"))
+
+            if event is not None:
+                self.dispatchEvent(event)
+
+            if line and i >= firstLogged:
+                self.handleLine(line)
+
+    # --------------------------------------------------------------------------------------------------------
+
+    def dispatchEvent(self, event):
+        eventType, data = event
+
+        if eventType == BACKEND_EVENT_READY:
+            self.backendReady.emit()
+        elif eventType == BACKEND_EVENT_XRUN:
+            self.backendXRun.emit(data)
+        elif eventType == BACKEND_EVENT_PLUGIN_LOAD:
+            self.backendPluginLoaded.emit(data)
+        elif eventType == BACKEND_EVENT_ERROR:
+            self.backendError.emit(data)
+
+    def handleLine(self, line):
+        if not self.fVerbose:
+            return
+
+        # coalesce repeated lines
+        if line == self.fLastLine:
+            self.fRepeatCount += 1
+            return
+
+        self.flushRepeats()
+        self.fLastLine = line
+        print("BACKEND:", line)
+
+    def handleDropped(self, count):
+        if not self.fVerbose:
+            return
+
+        self.flushRepeats()
+        self.fLastLine = ""
+        print("BACKEND: (too much output, dropped %s)" % count)
+
+    def flushRepeats(self):
+        if self.fRepeatCount == 0:
+            return
+
+        print("BACKEND: (last line repeated %i times)" % self.fRepeatCount)
+        self.fRepeatCount = 0
+
+# ------------------------------------------------------------------------------------------------------------
+# Backend Supervisor
+#
+# Decides when to restart a crashed backend, waiting longer after each crash in a row.
+# The waiting time is reset once the backend keeps running for a while.
+
+class BackendSupervisor(QObject):
+    # signals
+    restartRequested = pyqtSignal()
+    recovered        = pyqtSignal(float) # seconds since the crash
+
+    # time to wait before the first restart, doubled after each crash in a row, in ms
+    INITIAL_DELAY = 250
+    MAX_DELAY     = 30*1000
+
+    # how long the backend needs to keep running to be considered stable again, in ms
+    STABLE_TIME = 60*1000
+
+    def __init__(self, parent):
+        QObject.__init__(self, parent)
+
+        self.fDelay     = self.INITIAL_DELAY
+        self.fCrashTime = None
+
+        self.fRestartTimer = QTimer(self)
+        self.fRestartTimer.setSingleShot(True)
+        self.fRestartTimer.timeout.connect(self.restartRequested)
+
+        self.fStableTimer = QTimer(self)
+        self.fStableTimer.setSingleShot(True)
+        self.fStableTimer.timeout.connect(self.slot_backendStable)
+
+    def isRecovering(self):
+        return self.fCrashTime is not None
+
+    # Schedule a restart, called when the backend crashed
+    def backendCrashed(self):
+        self.fStableTimer.stop()
+
+        # time to recovery counts from the first crash
+        if self.fCrashTime is None:
+            self.fCrashTime = time.monotonic()
+
+        print("backend crashed, restarting in %i ms" % self.fDelay)
+
+        self.fRestartTimer.start(self.fDelay)
+        self.fDelay = min(self.fDelay * 2, self.MAX_DELAY)
+
+    # Called when the backend is ready, after a crash or not
+    def backendReady(self):
+        self.fStableTimer.start(self.STABLE_TIME)
+
+        if self.fCrashTime is None:
+            return
+
+        elapsed = time.monotonic() - self.fCrashTime
+        self.fCrashTime = None
+        self.recovered.emit(elapsed)
+
+    # Forget about previous crashes and cancel any pending restart, used when the backend is stopped on purpose
+    def reset(self):
+        self.fRestartTimer.stop()
+        self.fStableTimer.stop()
+        self.fDelay     = self.INITIAL_DELAY
+        self.fCrashTime = None
+
+    @pyqtSlot()
+    def slot_backendStable(self):
+        self.fDelay = self.INITIAL_DELAY
+
+# ------------------------------------------------------------------------------------------------------------
+# Standby Backend
+#
+# A second mod-host instance (a separate JACK client, on its own socket ports) that instantiates the plugins
+# of the pedalboard likely to be loaded next. This brings their binaries and data files into memory,
+# so loading that pedalboard in the main backend has less to wait for.
+# Plugins in the standby backend are never connected to anything, and are bypassed right after being added.
+# They're still active though, so they do add some DSP load while prewarmed.
+
+class StandbyBackend(QObject):
+    # signals
+    prewarmed = pyqtSignal(str) # bundle
+
+    # socket ports, away from the main backend's default ones
+    PORT          = 5655
+    FEEDBACK_PORT = 5656
+
+    # instance numbers, away from the ones mod-ui uses, as they name the JACK clients ('effect_<n>')
+    FIRST_INSTANCE = 9000
+
+    def __init__(self, parent):
+        QObject.__init__(self, parent)
+
+        self.fParser   = BackendEventParser()
+        self.fOutput   = b""
+        self.fReply    = b""
+        self.fCommands = []    # commands not sent yet
+        self.fWaiting  = False # waiting for a reply
+        self.fBundle   = ""    # bundle being prewarmed
+        self.fPending  = None  # (bundle, plugins) to prewarm next
+        self.fWarm     = ""    # bundle that was prewarmed
+        self.fStopping = False
+        self.fRestart  = ""    # host path to start again with, once stopped
+
+        self.fProcess = QProcess(self)
+        self.fProcess.setProcessChannelMode(QProcess.MergedChannels)
+        self.fProcess.readyRead.connect(self.slot_processRead)
+        self.fProcess.finished.connect(self.slot_processFinished)
+
+        self.fSocket = QTcpSocket(self)
+        self.fSocket.connected.connect(self.sendNextCommand)
+        self.fSocket.readyRead.connect(self.slot_socketRead)
+
+        self.fKillTimer = QTimer(self)
+        self.fKillTimer.setSingleShot(True)
+        self.fKillTimer.setInterval(2000)
+        self.fKillTimer.timeout.connect(self.fProcess.kill)
+
+    def isRunning(self):
+        return self.fProcess.state() != QProcess.NotRunning
+
+    def start(self, hostPath):
+        # still stopping, start again once that's done
+        if self.fStopping:
+            self.fRestart = hostPath
+            return
+
+        if self.isRunning():
+            return
+
+        self.fOutput = b""
+        self.fProcess.start(hostPath, ["-n", "-p", str(self.PORT), "-f", str(self.FEEDBACK_PORT)])
+
+    # Stop without blocking, killing the process if it doesn't stop in time
+    def stop(self):
+        self.fSocket.abort()
+        self.fCommands = []
+        self.fWaiting  = False
+        self.fBundle   = ""
+        self.fWarm     = ""
+        self.fRestart  = ""
+
+        if not self.isRunning():
+            return
+
+        self.fStopping = True
+        self.fProcess.terminate()
+        self.fKillTimer.start()
+
+    # Instantiate the plugins of @a bundle, replacing whatever was prewarmed before
+    def prewarm(self, bundle, plugins):
+        if self.fPending is None and bundle in (self.fBundle, self.fWarm):
+            return
+
+        self.fPending = (bundle, plugins)
+
+        # no point in finishing the previous one
+        self.fCommands = []
+
+        self.sendNextCommand()
+
+    # --------------------------------------------------------------------------------------------------------
+
+    @pyqtSlot()
+    def sendNextCommand(self):
+        if self.fWaiting or self.fSocket.state() != QTcpSocket.ConnectedState:
+            return
+
+        if len(self.fCommands) == 0:
+            if self.fPending is not None:
+                self.fBundle, plugins = self.fPending
+                self.fPending  = None
+                self.fWarm     = ""
+                self.fCommands = ["remove -1"]
+
+                for i, uri in enumerate(plugins, self.FIRST_INSTANCE):
+                    self.fCommands.append("add %s %i" % (uri, i))
+                    self.fCommands.append("bypass %i 1" % i)
+
+            elif self.fBundle:
+                self.fWarm   = self.fBundle
+                self.fBundle = ""
+                self.prewarmed.emit(self.fWarm)
+                return
+
+            else:
+                return
+
+        self.fWaiting = True
+        self.fSocket.write(self.fCommands.pop(0).encode("utf-8") + b"\0")
+
+    @pyqtSlot()
+    def slot_socketRead(self):
+        self.fReply += bytes(self.fSocket.readAll())
+
+        # replies are null-terminated, we only care that they arrived
+        while b"\0" in self.fReply:
+            reply, _, self.fReply = self.fReply.partition(b"\0")
+            self.fWaiting = False
+
+        self.sendNextCommand()
+
+    @pyqtSlot()
+    def slot_processRead(self):
+        data  = self.fOutput + bytes(self.fProcess.readAllStandardOutput())
+        lines = data.split(b"\n")
+
+        self.fOutput = lines.pop()
+
+        for rawLine in lines:
+            line, event = self.fParser.parse(str(rawLine, encoding="utf-8", errors="ignore"))
+
+            if event is None:
+                continue
+
+            eventType, data = event
+
+            if eventType == BACKEND_EVENT_READY:
+                self.fSocket.connectToHost("127.0.0.1", self.PORT)
+
+            elif eventType == BACKEND_EVENT_ERROR:
+                print("STANDBY BACKEND:", line)
+
+    @pyqtSlot(int, QProcess.ExitStatus)
+    def slot_processFinished(self, exitCode, exitStatus):
+        self.fKillTimer.stop()
+        self.fSocket.abort()
+        self.fReply    = b""
+        self.fCommands = []
+        self.fWaiting  = False
+        self.fBundle   = ""
+        self.fWarm     = ""
+        self.fStopping = False
+
+        if self.fRestart:
+            hostPath = self.fRestart
+            self.fRestart = ""
+            self.start(hostPath)
+
+# ------------------------------------------------------------------------------------------------------------
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# MOD-App
+# Copyright (C) 2014-2015 Filipe Coelho <falktx@falktx.com>
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 3 of
+# the License, or any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# For a full copy of the GNU General Public License see the LICENSE file.
+
+# ------------------------------------------------------------------------------------------------------------
+# Cache of parsed lv2 bundle information
+#
+# This module has no Qt or mod-ui dependencies, so it can be used by the scripts in tests/ as well.
+
+# ------------------------------------------------------------------------------------------------------------
+# Imports (Global)
+
+import json
+import os
+import time
+
+from collections import OrderedDict
+from hashlib import sha1
+from threading import Lock
+
+# ------------------------------------------------------------------------------------------------------------
+# Default location, same as CACHE_DIR in mod_common
+
+DEFAULT_BUNDLE_INFO_CACHE_DIR = os.path.expanduser("~/.cache/mod-app/bundle-info/")
+
+# ------------------------------------------------------------------------------------------------------------
+# Versioned File Directory
+#
+# Cached files named '<source>-<version><suffix>', with both parts being hashes chosen by the user of this class.
+# Storing a new version of a source removes the older ones. Files not used for a while are pruned once per
+# instance, so files are marked as used when read. Temporary files are never pruned, they might belong to
+# another instance of the app. Safe to use from multiple threads.
+
+class VersionedFileDirectory(object):
+    # files not used for this long are removed, in seconds
+    MAX_UNUSED_TIME = 30*24*60*60
+
+    def __init__(self, directory, suffix):
+        object.__init__(self)
+
+        self.fDirectory = directory
+        self.fSuffix    = suffix
+        self.fLock      = Lock()
+        self.fPruned    = False
+
+    def getKey(self, source, version):
+        return "%s-%s" % (source, version)
+
+    def getFilename(self, key):
+        return os.path.join(self.fDirectory, key + self.fSuffix)
+
+    def markUsed(self, filename):
+        try:
+            os.utime(filename)
+        except OSError:
+            pass
+
+    # Store @a filename, written by @a writer(tmpFilename) which returns false if that failed.
+    # Errors are not fatal, the file is just not cached then.
+    def store(self, filename, writer):
+        tmpFilename = "%s.%i.tmp" % (filename, os.getpid())
+
+        try:
+            os.makedirs(self.fDirectory, exist_ok=True)
+
+            if not writer(tmpFilename):
+                raise ValueError("failed to write '%s'" % tmpFilename)
+
+            os.replace(tmpFilename, filename)
+            names = os.listdir(self.fDirectory)
+
+        except (IOError, OSError, TypeError, ValueError):
+            try:
+                os.remove(tmpFilename)
+            except OSError:
+                pass
+            return False
+
+        # remove older versions of the same source
+        name   = os.path.basename(filename)
+        prefix = name.split("-", 1)[0] + "-"
+
+        for oldName in names:
+            if oldName.startswith(prefix) and oldName != name and not oldName.endswith(".tmp"):
+                self.remove(oldName)
+
+        self.pruneUnused()
+        return True
+
+    # Remove files that were not used recently, only done once
+    def pruneUnused(self):
+        with self.fLock:
+            if self.fPruned:
+                return
+            self.fPruned = True
+
+        try:
+            names = os.listdir(self.fDirectory)
+        except OSError:
+            return
+
+        oldest = time.time() - self.MAX_UNUSED_TIME
+
+        for name in names:
+            if name.endswith(".tmp"):
+                continue
+
+            try:
+                if os.stat(os.path.join(self.fDirectory, name)).st_mtime < oldest:
+                    self.remove(name)
+            except OSError:
+                pass
+
+    def remove(self, name):
+        try:
+            os.remove(os.path.join(self.fDirectory, name))
+        except OSError:
+            pass
+
+# ------------------------------------------------------------------------------------------------------------
+# Bundle Info Cache
+#
+# Parsed information is stored as JSON in a VersionedFileDirectory, the source being the bundle path and @a kind,
+# and the version the contents of all the bundle's turtle files. Any edit to the bundle's RDF data gives a new
+# version. Different parsers return different information, so each one uses its own @a kind of entries.
+# Recently used entries are also kept in memory.
+
+class BundleInfoCache(object):
+    # number of entries kept in memory
+    MAX_MEMORY_ITEMS = 256
+
+    def __init__(self, directory=DEFAULT_BUNDLE_INFO_CACHE_DIR):
+        object.__init__(self)
+
+        self.fFiles = VersionedFileDirectory(directory, ".json")
+        self.fLock  = Lock()
+
+        # key -> info, least recently used first
+        self.fMemory = OrderedDict()
+
+    # Hash of the bundle path and @a kind, plus a hash of the names and contents of all turtle files in @a bundle
+    def getKey(self, bundle, kind):
+        source = sha1(("%s:%s" % (kind, os.path.abspath(bundle))).encode("utf-8", errors="ignore"))
+        hasher = sha1(kind.encode("utf-8"))
+
+        for name in sorted(os.listdir(bundle)):
+            if not name.endswith(".ttl"):
+                continue
+
+            hasher.update(b"\0" + name.encode("utf-8", errors="ignore") + b"\0")
+
+            with open(os.path.join(bundle, name), "rb") as fh:
+                hasher.update(fh.read())
+
+        return self.fFiles.getKey(source.hexdigest(), hasher.hexdigest())
+
+    # Get the information of @a bundle, only calling @a parser(bundle) if it's not cached yet
+    def get(self, bundle, kind, parser):
+        try:
+            key = self.getKey(bundle, kind)
+        except (IOError, OSError):
+            return parser(bundle)
+
+        with self.fLock:
+            if key in self.fMemory:
+                self.fMemory.move_to_end(key)
+                return self.fMemory[key]
+
+        filename = self.fFiles.getFilename(key)
+
+        try:
+            with open(filename, "r", encoding="utf-8") as fh:
+                info = json.load(fh)
+
+        except (IOError, OSError, ValueError):
+            info = parser(bundle)
+            self.fFiles.store(filename, lambda tmpFilename: self.write(tmpFilename, info))
+
+        else:
+            self.fFiles.markUsed(filename)
+
+        with self.fLock:
+            self.fMemory[key] = info
+
+            while len(self.fMemory) > self.MAX_MEMORY_ITEMS:
+                self.fMemory.popitem(last=False)
+
+        return info
+
+    def write(self, filename, info):
+        with open(filename, "w", encoding="utf-8") as fh:
+            json.dump(info, fh)
+
+        return True
+
+# ------------------------------------------------------------------------------------------------------------
+# Shared cache, created on first use
+
+_bundleInfoCache = None
+
+def getCachedBundleInfo(bundle, kind, parser):
+    global _bundleInfoCache
+
+    if _bundleInfoCache is None:
+        _bundleInfoCache = BundleInfoCache()
+
+    return _bundleInfoCache.get(bundle, kind, parser)
+
+# ------------------------------------------------------------------------------------------------------------
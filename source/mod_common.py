@@ -17,7 +17,14 @@
 # For a full copy of the GNU General Public License see the LICENSE file.
 
 # ------------------------------------------------------------------------------------------------------------
-# Generate a random port number between 9000 and 18000
+# Startup profiling, needs to be first
+
+from mod_profile import STARTUP_PROFILER
+
+STARTUP_PROFILER.begin("mod_common")
+
+# ------------------------------------------------------------------------------------------------------------
+# Generate a random port number between 9000 and 18000, only used if setupWebServerSocket() fails
 
 from random import random
 
@@ -55,6 +62,10 @@ else:
 USING_LIVE_ISO   = bool("--using-live-iso"   in sys.argv)
 SKIP_INTEGRATION = bool("--skip-integration" in sys.argv)
 
+# Run a second backend to prewarm the next pedalboard, see StandbyBackend
+# Costs extra CPU, as the prewarmed plugins stay active (bypassed) next to the ones in use
+USING_STANDBY_BACKEND = bool("--standby-backend" in sys.argv) and not USING_LIVE_ISO
+
 if USING_LIVE_ISO:
     config["addr"] = "http://127.0.0.1:17891"
     config["port"] = "17891"
@@ -91,6 +102,19 @@ else:
     MACOS   = False
     WINDOWS = False
 
+# ------------------------------------------------------------------------------------------------------------
+# Let the webview reach the webserver through a unix socket, see UnixSocketNetworkAccessManager
+
+USING_UNIX_SOCKET = bool("--unix-socket" in sys.argv) and not WINDOWS
+
+def getWebServerUnixSocketPath():
+    return "/tmp/mod-app-web-%s.sock" % config["port"]
+
+# ------------------------------------------------------------------------------------------------------------
+# Let the webview call the webserver directly, without HTTP, see InProcessNetworkAccessManager
+
+USING_IN_PROCESS_WEBVIEW = bool("--in-process-webview" in sys.argv)
+
 # ------------------------------------------------------------------------------------------------------------
 # Use custom modules if available
 
@@ -111,6 +135,9 @@ else:
 
 DATA_DIR = os.path.expanduser("~/.local/share/mod-data/")
 
+# mod-app's own disposable data (indexes, thumbnails), safe to delete at any time
+CACHE_DIR = os.path.expanduser("~/.cache/mod-app/")
+
 os.environ['MOD_DEV_HOST'] = "0"
 os.environ['MOD_DEV_HMI']  = "1"
 os.environ['MOD_LOG']      = "0"
@@ -129,6 +156,54 @@ os.environ['MOD_DEVICE_WEBSERVER_PORT'] = config["port"]
 if not SKIP_INTEGRATION:
     os.environ['MOD_APP'] = "1"
 
+STARTUP_PROFILER.end("mod_common")
+
+# ------------------------------------------------------------------------------------------------------------
+# Set up the webserver socket
+#
+# Binds a socket on a free port (or uses the one given with '--webserver-fd=N') and updates the config to match.
+# Needs to be called before mod-ui is imported, as it reads the port from the environment.
+# Returns the socket, or None if that failed and the webserver should use the configured port as before.
+
+_webServerSocket = None
+
+def setupWebServerSocket():
+    global _webServerSocket
+
+    if _webServerSocket is not None:
+        return _webServerSocket
+
+    import socket
+
+    try:
+        fd = -1
+        for arg in sys.argv[1:]:
+            if arg.startswith("--webserver-fd="):
+                fd = int(arg.split("=", 1)[1])
+
+        if fd >= 0:
+            sock = socket.fromfd(fd, socket.AF_INET, socket.SOCK_STREAM)
+        else:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            sock.bind(("0.0.0.0", int(config["port"]) if USING_LIVE_ISO else 0))
+
+        sock.listen(128)
+        sock.setblocking(False)
+
+    except (OSError, ValueError) as e:
+        print("Failed to set up webserver socket, using port %s:" % config["port"], e)
+        return None
+
+    port = str(sock.getsockname()[1])
+
+    config["addr"] = "http://127.0.0.1:%s" % port
+    config["port"] = port
+    os.environ['MOD_DEVICE_WEBSERVER_PORT'] = port
+
+    _webServerSocket = sock
+    return sock
+
 # ------------------------------------------------------------------------------------------------------------
 # Settings keys
 
@@ -173,6 +248,8 @@ MOD_DEFAULT_WEBVIEW_SHOW_INSPECTOR  = False
 # Set initial settings
 
 def setInitialSettings():
+    STARTUP_PROFILER.begin("setInitialSettings")
+
     if USING_LIVE_ISO:
         webviewVerbose = False
 
@@ -190,4 +267,6 @@ def setInitialSettings():
     # cleanup
     del webviewVerbose
 
+    STARTUP_PROFILER.end("setInitialSettings")
+
 # ------------------------------------------------------------------------------------------------------------
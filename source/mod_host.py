@@ -19,25 +19,27 @@
 # ------------------------------------------------------------------------------------------------------------
 # Imports (Custom)
 
+from mod_backend import *
+from mod_bundlecache import getCachedBundleInfo
+from mod_pedalboards import *
 from mod_settings import *
 
 # ------------------------------------------------------------------------------------------------------------
 # Imports (Global)
 
+from collections import OrderedDict
+from threading import Event, Lock
+
 if using_Qt4:
-    from PyQt4.QtCore import pyqtSignal, pyqtSlot, qCritical, qWarning, Qt, QFileInfo, QProcess, QSettings, QSize, QThread, QTimer, QUrl
+    from PyQt4.QtCore import pyqtSignal, pyqtSlot, qCritical, qWarning, Qt, QEvent, QFileInfo, QModelIndex, QProcess, QSettings, QSize, QThread, QTimer, QUrl
     from PyQt4.QtGui import QDesktopServices, QImage, QPainter, QPixmap
-    from PyQt4.QtGui import QAction, QApplication, QDialog, QFileDialog, QInputDialog, QLineEdit, QListWidgetItem
+    from PyQt4.QtGui import QAction, QApplication, QDialog, QFileDialog, QInputDialog, QLineEdit
     from PyQt4.QtGui import QMainWindow, QMessageBox, QPlainTextEdit, QVBoxLayout
-    from PyQt4.QtWebKit import QWebSettings
-    from PyQt4.QtWebKit import QWebInspector, QWebPage, QWebView
 else:
-    from PyQt5.QtCore import pyqtSignal, pyqtSlot, qCritical, qWarning, Qt, QFileInfo, QProcess, QSettings, QSize, QThread, QTimer, QUrl
+    from PyQt5.QtCore import pyqtSignal, pyqtSlot, qCritical, qWarning, Qt, QEvent, QFileInfo, QModelIndex, QProcess, QSettings, QSize, QThread, QTimer, QUrl
     from PyQt5.QtGui import QDesktopServices, QImage, QPainter, QPixmap
-    from PyQt5.QtWidgets import QAction, QApplication, QDialog, QFileDialog, QInputDialog, QLineEdit, QListWidgetItem
+    from PyQt5.QtWidgets import QAction, QApplication, QDialog, QFileDialog, QInputDialog, QLineEdit
     from PyQt5.QtWidgets import QMainWindow, QMessageBox, QPlainTextEdit, QVBoxLayout
-    from PyQt5.QtWebKit import QWebSettings
-    from PyQt5.QtWebKitWidgets import QWebInspector, QWebPage, QWebView
 
 # ------------------------------------------------------------------------------------------------------------
 # Imports (UI)
@@ -48,18 +50,85 @@ from ui_mod_pedalboard_save import Ui_PedalboardSave
 
 # ------------------------------------------------------------------------------------------------------------
 # Import (WebServer)
+#
+# mod-ui (and tornado with it) takes a while to import, so it's done in a background thread while the main
+# window shows up. These globals are None until importModUi() has been called.
 
-# need to set initial settings before importing MOD stuff
+# need to set up the webserver port and initial settings before importing MOD stuff
+webServerSocket = setupWebServerSocket()
 setInitialSettings()
 
-from mod import webserver
-from mod.session import SESSION
-from mod.utils import get_bundle_dirname, get_all_pedalboards, get_pedalboard_info
+webserver           = None
+SESSION             = None
+get_pedalboard_info = None
+
+_modUiImportLock = Lock()
+
+def importModUi():
+    global webserver, SESSION, get_pedalboard_info
+
+    with _modUiImportLock:
+        if webserver is not None:
+            return
+
+        STARTUP_PROFILER.begin("import mod-ui")
+
+        from mod import webserver as _webserver
+        from mod.session import SESSION as _SESSION
+        from mod.utils import get_pedalboard_info as _get_pedalboard_info
+
+        SESSION             = _SESSION
+        get_pedalboard_info = _get_pedalboard_info
+        webserver           = _webserver
+
+        STARTUP_PROFILER.end("import mod-ui")
+
+# Make the webserver listen on our socket instead of binding its own port, and on a unix socket if requested.
+# TCP is always kept, websockets don't go through the webview's network access manager.
+def useWebServerSockets():
+    from tornado.httpserver import HTTPServer
+    from tornado.netutil import bind_unix_socket
+
+    application = webserver.application
+
+    def listen(port, address="", **kwargs):
+        server = HTTPServer(application, **kwargs)
+
+        if webServerSocket is not None:
+            server.add_socket(webServerSocket)
+        else:
+            server.listen(port, address)
+
+        if USING_UNIX_SOCKET:
+            try:
+                server.add_socket(bind_unix_socket(getWebServerUnixSocketPath()))
+            except (IOError, OSError) as e:
+                # the webview falls back to TCP if the socket doesn't exist
+                print("Failed to listen on unix socket:", e)
+
+        return server
+
+    application.listen = listen
+
+# ------------------------------------------------------------------------------------------------------------
+# mod-ui Import Thread
+
+class ModUiImportThread(QThread):
+    def __init__(self, parent):
+        QThread.__init__(self, parent)
 
-from mod import webserver
+    def run(self):
+        try:
+            importModUi()
+        except Exception as e:
+            # will be tried again on the main thread, showing the real error
+            print("Failed to import mod-ui in the background:", e)
 
 # ------------------------------------------------------------------------------------------------------------
 # WebServer Thread
+#
+# Preparing the webserver doesn't need the backend, so the thread is started together with it.
+# The webserver itself only starts once setBackendReady() is called.
 
 class WebServerThread(QThread):
     # signals
@@ -71,90 +140,116 @@ class WebServerThread(QThread):
     def __init__(self, parent=None):
         QThread.__init__(self, parent)
 
+        self.fBackendReady = Event()
+        self.fCancelled    = False
+        self.fStarted      = False
+
+    def startAndPrepare(self):
+        if self.isRunning():
+            return
+
+        self.fBackendReady.clear()
+        self.fCancelled = False
+        self.fStarted   = False
+        self.start()
+
+    def setBackendReady(self):
+        self.fBackendReady.set()
+
     def run(self):
         if not self.prepareWasCalled:
             self.prepareWasCalled = True
+            STARTUP_PROFILER.begin("webserver prepare")
+
+            if webServerSocket is not None or USING_UNIX_SOCKET:
+                try:
+                    useWebServerSockets()
+                except (AttributeError, ImportError):
+                    # can't pass it along, free the port right before the webserver takes it
+                    if webServerSocket is not None:
+                        webServerSocket.close()
+
             webserver.prepare(True)
+            STARTUP_PROFILER.end("webserver prepare")
 
+        self.fBackendReady.wait()
+
+        if self.fCancelled:
+            return
+
+        self.fStarted = True
         self.running.emit()
         webserver.start()
 
-    def stopWait(self):
-        webserver.stop()
-        return self.wait(5000)
+    # Ask the webserver to stop, without waiting for it
+    def stop(self):
+        self.fCancelled = True
+        self.fBackendReady.set()
 
-# ------------------------------------------------------------------------------------------------------------
-# Host WebPage
+        if self.fStarted:
+            webserver.stop()
 
-class HostWebPage(QWebPage):
-    def __init__(self, parent):
-        QWebPage.__init__(self, parent)
-
-    def javaScriptAlert(self, frame, msg):
-        if USING_LIVE_ISO: return
-        QMessageBox.warning(self.parent(),
-                            self.tr("MOD-App Alert"),
-                            msg,
-                            QMessageBox.Ok)
-
-    def javaScriptConfirm(self, frame, msg):
-        if USING_LIVE_ISO: return True
-        return (QMessageBox.question(self.parent(),
-                                     self.tr("MOD-App Confirm"),
-                                     msg,
-                                     QMessageBox.Yes|QMessageBox.No, QMessageBox.No) == QMessageBox.Yes)
-
-    def javaScriptPrompt(self, frame, msg, default):
-        if USING_LIVE_ISO: return True, "live"
-        res, ok = QInputDialog.getText(self.parent(),
-                                       self.tr("MOD-App Prompt"),
-                                       msg,
-                                       QLineEdit.Normal, default)
-        return ok, res
-
-    def shouldInterruptJavaScript(self):
-        if USING_LIVE_ISO: return False
-        return (QMessageBox.question(self.parent(),
-                                     self.tr("MOD-App Problem"),
-                                     self.tr("The script on this page appears to have a problem. Do you want to stop the script?"),
-                                     QMessageBox.Yes|QMessageBox.No, QMessageBox.No) == QMessageBox.Yes)
+    def stopWait(self):
+        self.stop()
+        return self.wait(5000)
 
 # ------------------------------------------------------------------------------------------------------------
 # Open Pedalboard Window
 
 class OpenPedalboardWindow(QDialog):
-    def __init__(self, parent, pedalboards):
+    # signals
+    pedalboardHighlighted = pyqtSignal(str) # bundle
+
+    def __init__(self, parent, searchIndex, thumbnailCache):
         QDialog.__init__(self)
         self.ui = Ui_PedalboardOpen()
         self.ui.setupUi(self)
 
-        self.fSelectedURI = ""
+        self.fSelectedBundle = ""
 
-        for pedalboard in pedalboards:
-            item = QListWidgetItem(self.ui.listWidget)
-            item.setData(Qt.UserRole, pedalboard['uri'])
-            item.setIcon(QIcon(os.path.join(pedalboard['bundle'], "thumbnail.png")))
-            item.setText(pedalboard['title'])
-            self.ui.listWidget.addItem(item)
+        thumbnailCache.setSize(self.ui.listView.iconSize())
 
-        self.ui.listWidget.setCurrentRow(0)
+        self.fModel = PedalboardListModel(self, searchIndex.pedalboards(), thumbnailCache)
+        self.fFilterModel = PedalboardFilterModel(self, searchIndex)
+        self.fFilterModel.setSourceModel(self.fModel)
 
-        self.accepted.connect(self.slot_setSelectedURI)
-        self.ui.listWidget.doubleClicked.connect(self.accept)
+        self.ui.listView.setModel(self.fFilterModel)
+        self.ui.listView.setCurrentIndex(self.fFilterModel.index(0, 0))
+        self.ui.le_search.setFocus()
 
-    def getSelectedURI(self):
-        return self.fSelectedURI
+        self.accepted.connect(self.slot_setSelectedBundle)
+        self.ui.listView.selectionModel().currentChanged.connect(self.slot_currentChanged)
+        self.ui.listView.doubleClicked.connect(self.accept)
+        self.ui.le_search.textChanged.connect(self.slot_searchTextChanged)
+
+    def getSelectedBundle(self):
+        return self.fSelectedBundle
+
+    @pyqtSlot(str)
+    def slot_searchTextChanged(self, text):
+        self.fFilterModel.setSearchText(text)
+
+        if not self.ui.listView.currentIndex().isValid():
+            self.ui.listView.setCurrentIndex(self.fFilterModel.index(0, 0))
+
+    @pyqtSlot(QModelIndex, QModelIndex)
+    def slot_currentChanged(self, current, previous):
+        if not current.isValid():
+            return
+
+        self.pedalboardHighlighted.emit(current.data(PedalboardListModel.BundleRole))
 
     @pyqtSlot()
-    def slot_setSelectedURI(self):
-        item = self.ui.listWidget.currentItem()
+    def slot_setSelectedBundle(self):
+        index = self.ui.listView.currentIndex()
 
-        if item is None:
+        if not index.isValid():
             return
 
-        self.fSelectedURI = item.data(Qt.UserRole)
+        self.fSelectedBundle = index.data(PedalboardListModel.BundleRole)
 
     def done(self, r):
+        self.fModel.stopLoader()
         QDialog.done(self, r)
         self.close()
 
@@ -169,6 +264,8 @@ class HostWindow(QMainWindow):
     # --------------------------------------------------------------------------------------------------------
 
     def __init__(self):
+        STARTUP_PROFILER.begin("HostWindow.__init__")
+
         QMainWindow.__init__(self)
         self.ui = Ui_HostWindow()
         self.ui.setupUi(self)
@@ -176,8 +273,8 @@ class HostWindow(QMainWindow):
         # ----------------------------------------------------------------------------------------------------
         # Internal stuff
 
-        # Current mod-ui title
-        #self.fCurrentBundle = ""
+        # Current mod-ui bundle and title
+        self.fCurrentBundle = ""
         self.fCurrentTitle  = ""
 
         # Next bundle to load (done by startup arguments)
@@ -189,17 +286,60 @@ class HostWindow(QMainWindow):
         # need to call session reconnect after connecting the 1st time
         self.fNeedsSessionReconnect = False
 
+        # backend got ready before mod-ui was imported, continue once it is
+        self.fBackendReadyPending = False
+
+        # restarting only the backend, keeping the webserver and webview
+        self.fHotRestarting = False
+
+        # start the backend again once it (and the webserver, unless hot restarting) stopped
+        self.fStartBackendWhenStopped = False
+
+        # close the window once the backend and webserver stopped
+        self.fClosing = False
+
+        # Pedalboards of the set list (as index entries) and the current position in it
+        self.fSetList       = []
+        self.fSetListIndex  = -1
+        self.fSetListThread = None
+
         # Qt idle timer
         self.fIdleTimerId = 0
 
+        # Startup stages still in progress, as name -> description
+        self.fStartupStages     = OrderedDict()
+        self.fStartupStageCount = 0
+        self.fStartupStarted    = False
+
         # Qt web frame, used for evaluating javascript
         self.fWebFrame = None
 
+        # waiting for the page to tell it's ready, see slot_webviewPageReady()
+        self.fWaitingForPageReady = False
+        self.fPageReady           = False
+
+        # show the web inspector as soon as the page is ready
+        self.fShowInspectorWhenReady = False
+
+        # Last cloud login state pushed by the page, kept up to date by it
+        self.fCloudLoggedIn = False
+
         # to be filled with key-value pairs of current settings
         self.fSavedSettings = {}
 
-        # List of pedalboards
-        self.fPedalboards = get_all_pedalboards()
+        # Persistent index of pedalboards, loaded and revalidated in the background
+        self.fPedalboardIndex = PedalboardIndex(os.path.join(CACHE_DIR, "pedalboards.json"))
+        self.fPedalboardIndexThread = PedalboardIndexThread(self, self.fPedalboardIndex)
+
+        # Keeps the pedalboard index up to date with changes on disk
+        self.fPedalboardWatcher = PedalboardWatcher(self, self.fPedalboardIndex, self.fPedalboardIndexThread)
+
+        # List of pedalboards, and their search index
+        self.fPedalboardSearch = self.fPedalboardIndex.searchIndex()
+        self.fPedalboards      = self.fPedalboardSearch.pedalboards()
+
+        # Icon-sized pedalboard thumbnails, shared by all Open Pedalboard dialogs (which set the icon size)
+        self.fThumbnailCache = ThumbnailCache(os.path.join(CACHE_DIR, "thumbnails"))
 
         # List of current-pedalboard presets
         self.fPresetMenuList = []
@@ -210,24 +350,42 @@ class HostWindow(QMainWindow):
         self.fProccessBackend.setReadChannel(QProcess.StandardOutput)
         self.fStoppingBackend = False
 
+        # Thread that parses the backend output
+        self.fBackendLogReader = BackendLogReader(self)
+
+        # Restarts the backend after a crash
+        self.fBackendSupervisor = BackendSupervisor(self)
+
+        # Second backend that prewarms the next pedalboard, only used with '--standby-backend'
+        self.fStandbyBackend = StandbyBackend(self)
+
         # Thread for managing the webserver
         self.fWebServerThread = WebServerThread(self)
 
-        # ----------------------------------------------------------------------------------------------------
-        # Set up GUI
+        # Escalation in case the backend or webserver don't stop in time
+        self.fBackendKillTimer = QTimer(self)
+        self.fBackendKillTimer.setSingleShot(True)
+        self.fBackendKillTimer.setInterval(2000)
 
-        self.ui.webview = QWebView(self.ui.swp_webview)
-        self.ui.webview.setMinimumWidth(980)
-        self.ui.swp_webview.layout().addWidget(self.ui.webview)
+        self.fWebServerTerminateTimer = QTimer(self)
+        self.fWebServerTerminateTimer.setSingleShot(True)
+        self.fWebServerTerminateTimer.setInterval(5000)
 
-        self.ui.webpage = HostWebPage(self)
-        self.ui.webpage.setViewportSize(QSize(980, 600))
-        self.ui.webview.setPage(self.ui.webpage)
+        # Shows the page anyway if it loaded but never said it's ready (a script error, for example)
+        self.fPageReadyTimer = QTimer(self)
+        self.fPageReadyTimer.setSingleShot(True)
+        self.fPageReadyTimer.setInterval(5000)
 
-        self.ui.webinspector = QWebInspector(None)
-        self.ui.webinspector.resize(800, 600)
-        self.ui.webinspector.setPage(self.ui.webpage)
-        self.ui.webinspector.setVisible(False)
+        # Thread for importing mod-ui in the background
+        self.fModUiImportThread = ModUiImportThread(self)
+
+        # ----------------------------------------------------------------------------------------------------
+        # Set up GUI
+
+        # webview is created later, see setupWebView()
+        self.ui.webview      = None
+        self.ui.webpage      = None
+        self.ui.webinspector = None
 
         self.ui.act_file_connect.setEnabled(False)
         self.ui.act_file_connect.setVisible(False)
@@ -246,8 +404,14 @@ class HostWindow(QMainWindow):
         self.ui.act_pedalboard_save.setEnabled(False)
         self.ui.act_pedalboard_save_as.setEnabled(False)
         self.ui.act_pedalboard_share.setEnabled(False)
+        self.ui.act_pedalboard_previous.setEnabled(False)
+        self.ui.act_pedalboard_next.setEnabled(False)
         self.ui.menu_Pedalboard.setEnabled(False)
 
+        # set list shortcuts need to work without the menu too
+        self.addAction(self.ui.act_pedalboard_previous)
+        self.addAction(self.ui.act_pedalboard_next)
+
         # disable presets menu
         self.ui.act_presets_new.setEnabled(False)
         self.ui.act_presets_save.setEnabled(False)
@@ -300,10 +464,23 @@ class HostWindow(QMainWindow):
         self.fProccessBackend.finished.connect(self.slot_backendFinished)
         self.fProccessBackend.readyRead.connect(self.slot_backendRead)
 
+        self.fBackendLogReader.backendReady.connect(self.slot_backendStartPhase2)
+        self.fBackendLogReader.backendError.connect(self.slot_backendLogError)
+
+        self.fBackendSupervisor.restartRequested.connect(self.slot_backendRecover)
+        self.fBackendKillTimer.timeout.connect(self.slot_backendKill)
+        self.fWebServerTerminateTimer.timeout.connect(self.slot_webServerTerminate)
+        self.fPageReadyTimer.timeout.connect(self.slot_webviewPageReadyTimeout)
+        self.fBackendSupervisor.recovered.connect(self.slot_backendRecovered)
+        self.fStandbyBackend.prewarmed.connect(self.slot_standbyPrewarmed)
+
         self.fWebServerThread.running.connect(self.slot_webServerRunning)
         self.fWebServerThread.finished.connect(self.slot_webServerFinished)
 
-        self.ui.menu_Pedalboard.aboutToShow.connect(self.slot_pedalboardCheckOnline)
+        self.fModUiImportThread.finished.connect(self.slot_modUiImported)
+
+        self.fPedalboardIndexThread.updated.connect(self.slot_pedalboardsUpdated)
+        self.fPedalboardIndexThread.finished.connect(self.slot_pedalboardIndexFinished)
 
         self.ui.act_file_refresh.triggered.connect(self.slot_fileRefresh)
         self.ui.act_file_inspect.triggered.connect(self.slot_fileInspect)
@@ -318,6 +495,8 @@ class HostWindow(QMainWindow):
         self.ui.act_pedalboard_save.triggered.connect(self.slot_pedalboardSave)
         self.ui.act_pedalboard_save_as.triggered.connect(self.slot_pedalboardSaveAs)
         self.ui.act_pedalboard_share.triggered.connect(self.slot_pedalboardShare)
+        self.ui.act_pedalboard_previous.triggered.connect(self.slot_pedalboardPrevious)
+        self.ui.act_pedalboard_next.triggered.connect(self.slot_pedalboardNext)
 
         self.ui.act_settings_configure.triggered.connect(self.slot_configure)
 
@@ -329,29 +508,183 @@ class HostWindow(QMainWindow):
         self.ui.b_configure.clicked.connect(self.slot_configure)
         self.ui.b_about.clicked.connect(self.slot_about)
 
-        # force our custom refresh
-        webReloadAction = self.ui.webpage.action(QWebPage.Reload)
-        webReloadAction.triggered.disconnect()
-        webReloadAction.triggered.connect(self.slot_fileRefresh)
-
         # ----------------------------------------------------------------------------------------------------
         # Final setup
 
         self.setProperWindowTitle()
-        SESSION.setupApp(self._pedal_changed_callback)
 
-        if not "--no-autostart" in sys.argv:
-            QTimer.singleShot(0, self.slot_backendStart)
+        self.fBackendLogReader.start()
+
+        # everything else starts once the intro page is painted
+        self.ui.label_progress.setText(self.tr("Starting..."))
+        self.ui.swp_intro.installEventFilter(self)
 
-        QTimer.singleShot(1, self.fixWebViewSize)
+        # in case the window is not visible (and so never painted)
+        QTimer.singleShot(500, self.slot_startupBegin)
+
+        STARTUP_PROFILER.end("HostWindow.__init__")
 
     def __del__(self):
         self.stopAndWaitForWebServer()
         self.stopAndWaitForBackend()
 
+    # --------------------------------------------------------------------------------------------------------
+    # Startup stages
+    #
+    # Independent stages run at the same time, each on its own thread or process where possible.
+    # The intro page shows the first stage still in progress.
+
+    @pyqtSlot()
+    def slot_startupBegin(self):
+        if self.fStartupStarted:
+            return
+
+        self.fStartupStarted = True
+        self.ui.swp_intro.removeEventFilter(self)
+        STARTUP_PROFILER.mark("intro painted")
+
+        if not "--no-autostart" in sys.argv:
+            self.startupStageBegin("backend", self.tr("Starting backend..."))
+            self.slot_backendStart()
+
+        self.startupStageBegin("mod-ui", self.tr("Loading web server..."))
+        self.fModUiImportThread.start()
+
+        self.startupStageBegin("index", self.tr("Indexing pedalboards..."))
+        self.fPedalboardIndexThread.start()
+
+        # needs the GUI thread, runs while the others are working
+        self.startupStageBegin("webview", self.tr("Creating web view..."))
+        QTimer.singleShot(0, self.setupWebView)
+
+    def startupStageBegin(self, name, description):
+        self.fStartupStages[name] = description
+        self.fStartupStageCount  += 1
+        self.updateStartupProgress()
+
+    def startupStageEnd(self, name):
+        if self.fStartupStages.pop(name, None) is None:
+            return
+
+        self.updateStartupProgress()
+
+    # Stop reporting startup stages, later progress is reported by the webview
+    def startupStagesFinished(self):
+        self.fStartupStages.clear()
+
+    def updateStartupProgress(self):
+        if len(self.fStartupStages) == 0:
+            return
+
+        done = self.fStartupStageCount - len(self.fStartupStages)
+        self.ui.label_progress.setText("%s (%i/%i)" % (next(iter(self.fStartupStages.values())), done, self.fStartupStageCount))
+
+    def eventFilter(self, obj, event):
+        if obj is self.ui.swp_intro and event.type() == QEvent.Paint and not self.fStartupStarted:
+            # let the paint finish first
+            QTimer.singleShot(0, self.slot_startupBegin)
+
+        return QMainWindow.eventFilter(self, obj, event)
+
+    # --------------------------------------------------------------------------------------------------------
+    # Deferred setup
+
+    def setupWebView(self):
+        if self.ui.webview is not None:
+            return
+
+        STARTUP_PROFILER.begin("setupWebView")
+
+        from mod_webview import HostWebPage, QWebInspector, QWebPage, QWebView
+
+        self.ui.webview = QWebView(self.ui.swp_webview)
+        self.ui.webview.setMinimumWidth(980)
+        self.ui.swp_webview.layout().addWidget(self.ui.webview)
+
+        self.ui.webpage = HostWebPage(self)
+        self.ui.webpage.setViewportSize(QSize(980, 600))
+
+        # the in-process one needs the webserver, see setupWebViewNetwork()
+        if USING_UNIX_SOCKET and not USING_IN_PROCESS_WEBVIEW:
+            from mod_webview import UnixSocketNetworkAccessManager
+            self.ui.webpage.setNetworkAccessManager(UnixSocketNetworkAccessManager(self.ui.webpage, config["addr"]))
+        self.ui.webview.setPage(self.ui.webpage)
+
+        self.ui.webinspector = QWebInspector(None)
+        self.ui.webinspector.resize(800, 600)
+        self.ui.webinspector.setPage(self.ui.webpage)
+        self.ui.webinspector.setVisible(False)
+
+        # force our custom refresh
+        webReloadAction = self.ui.webpage.action(QWebPage.Reload)
+        webReloadAction.triggered.disconnect()
+        webReloadAction.triggered.connect(self.slot_fileRefresh)
+
+        self.ui.webpage.bridge().pageReady.connect(self.slot_webviewPageReady)
+        self.ui.webpage.bridge().pageStateChanged.connect(self.slot_webviewPageStateChanged)
+
+        inspectorEnabled = self.applyWebViewSettings()
+
+        self.fShowInspectorWhenReady = inspectorEnabled and self.fSavedSettings[MOD_KEY_WEBVIEW_SHOW_INSPECTOR]
+
+        self.fixWebViewSize()
+
+        self.startupStageEnd("webview")
+        STARTUP_PROFILER.end("setupWebView")
+
+    # Needs the webserver to be imported, only called once it's running
+    def setupWebViewNetwork(self):
+        if not USING_IN_PROCESS_WEBVIEW:
+            return
+
+        from mod_webview import InProcessNetworkAccessManager
+
+        if isinstance(self.ui.webpage.networkAccessManager(), InProcessNetworkAccessManager):
+            return
+
+        self.ui.webpage.setNetworkAccessManager(InProcessNetworkAccessManager(self.ui.webpage, config["addr"],
+                                                                              webserver.application,
+                                                                              os.environ['MOD_HTML_DIR']))
+
+    @pyqtSlot()
+    def slot_modUiImported(self):
+        # already finished, this returns right away
+        self.fModUiImportThread.wait()
+
+        if self.fClosing:
+            self.checkStopped()
+            return
+
+        # does nothing if the background import worked, otherwise shows the real error
+        importModUi()
+
+        self.startupStageEnd("mod-ui")
+
+        SESSION.setupApp(self._pedal_changed_callback)
+
+        # set list parsing needs mod-ui
+        if self.fSetListThread is not None:
+            self.fSetListThread.start()
+
+        if self.fProccessBackend.state() != QProcess.NotRunning:
+            self.fWebServerThread.startAndPrepare()
+
+        if self.fNextBundle and not self.fCurrentTitle:
+            try:
+                self.fCurrentTitle = getCachedBundleInfo(self.fNextBundle, "mod-ui:pedalboard", get_pedalboard_info)['name']
+            except:
+                self.fNextBundle   = ""
+                self.fCurrentTitle = ""
+
+            self.setProperWindowTitle()
+
+        if self.fBackendReadyPending:
+            self.fBackendReadyPending = False
+            self.slot_backendStartPhase2()
+
     def _pedal_changed_callback(self, ok, bundlepath, title):
-        #self.fCurrentBundle = bundlepath
-        self.fCurrentTitle = title or ""
+        self.fCurrentBundle = bundlepath or ""
+        self.fCurrentTitle  = title or ""
         #self.updatePresetsMenu()
         self.setProperWindowTitle()
 
@@ -372,6 +705,7 @@ class HostWindow(QMainWindow):
         self.ui.webview.loadStarted.connect(self.slot_webviewLoadStarted)
         self.ui.webview.loadProgress.connect(self.slot_webviewLoadProgress)
         self.ui.webview.loadFinished.connect(self.slot_webviewLoadFinished)
+        self.waitForPageReady()
         self.ui.webview.reload()
 
     @pyqtSlot()
@@ -381,21 +715,12 @@ class HostWindow(QMainWindow):
     # --------------------------------------------------------------------------------------------------------
     # Pedalboard (menu actions)
 
-    @pyqtSlot()
-    def slot_pedalboardCheckOnline(self):
-        if self.fWebFrame is None:
-            return
-        isOnline = self.fWebFrame.evaluateJavaScript("$('#mod-cloud').hasClass('logged')")
-        if isOnline is None:
-            return print("isOnline is None")
-        self.ui.act_pedalboard_share.setEnabled(isOnline)
-
     @pyqtSlot()
     def slot_pedalboardNew(self):
         if self.fWebFrame is None:
             return
 
-        self.fWebFrame.evaluateJavaScript("desktop.reset()")
+        self.ui.webpage.bridge().resetPedalboard.emit()
 
     # --------------------------------------------------------------------------------------------------------
 
@@ -404,33 +729,44 @@ class HostWindow(QMainWindow):
         if len(self.fPedalboards) == 0:
             return QMessageBox.information(self, self.tr("information"), "No pedalboards found")
 
-        dialog = OpenPedalboardWindow(self, self.fPedalboards)
+        dialog = OpenPedalboardWindow(self, self.fPedalboardSearch, self.fThumbnailCache)
+        dialog.pedalboardHighlighted.connect(self.prewarmPedalboard)
 
         if not dialog.exec_():
             return
 
-        pedalboard = dialog.getSelectedURI()
+        bundle = dialog.getSelectedBundle()
 
-        if not pedalboard:
+        if not bundle:
             return QMessageBox.information(self, self.tr("information"), "Invalid pedalboard selected")
 
-        try:
-            bundle = get_bundle_dirname(pedalboard)
-        except:
+        if self.fWebFrame is None:
             return
 
-        if self.fWebFrame is None:
+        self.ui.webpage.bridge().loadPedalboard.emit(bundle)
+
+    @pyqtSlot()
+    def slot_pedalboardsUpdated(self):
+        self.fPedalboardSearch = self.fPedalboardIndex.searchIndex()
+        self.fPedalboards      = self.fPedalboardSearch.pedalboards()
+
+    @pyqtSlot()
+    def slot_pedalboardIndexFinished(self):
+        # already finished, this returns right away
+        self.fPedalboardIndexThread.wait()
+
+        if self.fClosing:
+            self.checkStopped()
             return
 
-        self.fWebFrame.evaluateJavaScript("desktop.loadPedalboard(\"%s\")" % bundle)
+        self.startupStageEnd("index")
 
     def openPedalboardLater(self, filename):
-        try:
-            self.fNextBundle   = QFileInfo(filename).absoluteFilePath()
-            self.fCurrentTitle = get_pedalboard_info(self.fNextBundle)['name']
-        except:
-            self.fNextBundle   = ""
-            self.fCurrentTitle = ""
+        self.fNextBundle = QFileInfo(filename).absoluteFilePath()
+
+        # use the index if possible, otherwise this is checked once mod-ui is imported
+        pedalboard = self.fPedalboardIndex.getPedalboard(self.fNextBundle)
+        self.fCurrentTitle = pedalboard['title'] if pedalboard is not None else ""
 
     # --------------------------------------------------------------------------------------------------------
 
@@ -439,7 +775,7 @@ class HostWindow(QMainWindow):
         if self.fWebFrame is None:
             return
 
-        self.fWebFrame.evaluateJavaScript("desktop.saveCurrentPedalboard(%s)" % ("true" if saveAs else "false"))
+        self.ui.webpage.bridge().savePedalboard.emit(saveAs)
 
     @pyqtSlot()
     def slot_pedalboardSaveAs(self):
@@ -452,7 +788,68 @@ class HostWindow(QMainWindow):
         if self.fWebFrame is None:
             return
 
-        self.fWebFrame.evaluateJavaScript("desktop.shareCurrentPedalboard()")
+        self.ui.webpage.bridge().sharePedalboard.emit()
+
+    # --------------------------------------------------------------------------------------------------------
+    # Set List
+
+    def openSetListLater(self, bundles):
+        if len(bundles) == 0:
+            return
+
+        self.openPedalboardLater(bundles[0])
+        self.fSetListIndex = 0
+
+        self.fSetListThread = SetListThread(self, bundles)
+        self.fSetListThread.resolved.connect(self.slot_setListResolved)
+        self.fSetListThread.finished.connect(self.slot_setListThreadFinished)
+
+    @pyqtSlot(list)
+    def slot_setListResolved(self, entries):
+        self.fSetList = entries
+
+        if len(entries) == 0:
+            self.fSetListIndex = -1
+            return
+
+        bundles = [entry['bundle'] for entry in entries]
+        current = self.fCurrentBundle or self.fNextBundle
+        self.fSetListIndex = bundles.index(current) if current in bundles else 0
+
+        self.setListChanged()
+
+    @pyqtSlot()
+    def slot_setListThreadFinished(self):
+        # already finished, this returns right away
+        self.fSetListThread.wait()
+        self.checkStopped()
+
+    @pyqtSlot()
+    def slot_pedalboardPrevious(self):
+        self.loadSetListPedalboard(self.fSetListIndex - 1)
+
+    @pyqtSlot()
+    def slot_pedalboardNext(self):
+        self.loadSetListPedalboard(self.fSetListIndex + 1)
+
+    def loadSetListPedalboard(self, index):
+        if index < 0 or index >= len(self.fSetList):
+            return
+        if self.fWebFrame is None:
+            return
+
+        self.fSetListIndex = index
+        self.ui.webpage.bridge().loadPedalboard.emit(self.fSetList[index]['bundle'])
+        self.setListChanged()
+
+    def setListChanged(self):
+        self.ui.act_pedalboard_previous.setEnabled(self.fSetListIndex > 0)
+        self.ui.act_pedalboard_next.setEnabled(self.fSetListIndex + 1 < len(self.fSetList))
+
+        # get the next one ready
+        if USING_STANDBY_BACKEND and self.fSetListIndex + 1 < len(self.fSetList):
+            entry = self.fSetList[self.fSetListIndex + 1]
+            self.fStandbyBackend.prewarm(entry['bundle'], entry['plugins'])
 
     # --------------------------------------------------------------------------------------------------------
     # Presets (menu actions)
@@ -517,7 +914,13 @@ class HostWindow(QMainWindow):
             print("slot_backendStart ignored")
             return
 
+        # the previous webserver is still stopping, start once it's done
+        if self.fWebServerThread.isRunning() and not self.fHotRestarting:
+            self.fStartBackendWhenStopped = True
+            return
+
         print("slot_backendStart in progress...")
+        STARTUP_PROFILER.begin("backend start")
 
         if USING_LIVE_ISO:
             os.system("jack_wait -w")
@@ -527,14 +930,15 @@ class HostWindow(QMainWindow):
             hostArgs = ["-w", "-a", "mod-host"]
 
         else:
-            hostPath = self.fSavedSettings[MOD_KEY_HOST_PATH]
-            if hostPath.endswith("ingen"):
-                hostPath = MOD_DEFAULT_HOST_PATH
-
+            hostPath = self.getHostPath()
             hostArgs = ["-n"]
 
         self.fProccessBackend.start(hostPath, hostArgs)
 
+        # prepare the webserver while the backend starts, if mod-ui is imported by now
+        if webserver is not None:
+            self.fWebServerThread.startAndPrepare()
+
     @pyqtSlot()
     def slot_backendStop(self, forced = False):
         #if self.fPluginCount > 0:
@@ -549,20 +953,43 @@ class HostWindow(QMainWindow):
             #self.host.set_engine_about_to_close()
             #self.host.remove_all_plugins()
 
+        self.fStandbyBackend.stop()
+
+        # stopped on purpose, no automatic restart
+        self.fBackendSupervisor.reset()
+        self.fHotRestarting = False
+        self.fStartBackendWhenStopped = False
+
         # testing red color for server stopped
-        self.ui.webview.blockSignals(True)
-        self.ui.webview.setHtml("<html><body bgcolor='green'></body></html>")
-        self.ui.webview.blockSignals(False)
+        if self.ui.webview is not None:
+            self.ui.webview.blockSignals(True)
+            self.ui.webview.setHtml("<html><body bgcolor='green'></body></html>")
+            self.ui.webview.blockSignals(False)
 
-        self.stopAndWaitForWebServer()
-        self.stopAndWaitForBackend()
+        # both stop at the same time
+        self.stopWebServer()
+        self.stopBackend()
 
     @pyqtSlot()
     def slot_backendRestart(self):
+        # keep the web UI if it's up, only the backend needs restarting
+        if self.fWebFrame is not None and self.fWebServerThread.isRunning():
+            self.hotRestartBackend()
+            return
+
         #self.ui.stackedwidget.setCurrentIndex(0)
         self.slot_backendStop()
-        #QApplication.instance().processEvents()
-        self.slot_backendStart()
+        self.fStartBackendWhenStopped = True
+        self.checkStopped()
+
+    # Respawn mod-host only, the webserver reconnects to it and the current pedalboard is loaded again
+    def hotRestartBackend(self):
+        print("hot restart of backend in progress...")
+
+        self.fHotRestarting = True
+        self.fStartBackendWhenStopped = True
+        self.stopBackend()
+        self.checkStopped()
 
     # --------------------------------------------------------------------------------------------------------
 
@@ -573,36 +1000,76 @@ class HostWindow(QMainWindow):
         self.ui.act_backend_restart.setEnabled(True)
         self.ui.w_buttons.setEnabled(False)
         self.ui.label_progress.setText(self.tr("Loading backend..."))
+        self.updateStartupProgress()
 
     @pyqtSlot(int, QProcess.ExitStatus)
     def slot_backendFinished(self, exitCode, exitStatus):
+        self.fBackendKillTimer.stop()
+
+        # flush the last unterminated line, if any
+        self.fBackendLogReader.feed(b"\n")
+
+        # restart on crash, keeping the web UI if it's up
+        if exitStatus == QProcess.CrashExit and not self.fStoppingBackend:
+            self.fBackendSupervisor.backendCrashed()
+
+            # it holds JACK clients too, started again once the new backend is ready
+            self.fStandbyBackend.stop()
+
+            if self.fWebFrame is not None and self.fWebServerThread.isRunning():
+                self.fHotRestarting = True
+
         self.fFirstBackendInit = False
         self.fStoppingBackend = False
+
+        # a new backend process is started after this
+        if self.fHotRestarting:
+            self.ui.label_progress.setText(self.tr("Restarting backend..."))
+            self.checkStopped()
+            return
+
         self.ui.act_backend_start.setEnabled(True)
         self.ui.act_backend_stop.setEnabled(False)
         self.ui.act_backend_restart.setEnabled(False)
         self.ui.w_buttons.setEnabled(True)
         self.ui.label_progress.setText("")
         self.ui.stackedwidget.setCurrentIndex(0)
+        self.startupStageEnd("backend")
 
         # stop webserver
-        self.stopAndWaitForWebServer()
+        self.stopWebServer()
+        self.checkStopped()
 
     @pyqtSlot(QProcess.ProcessError)
     def slot_backendError(self, error):
         firstBackendInit = self.fFirstBackendInit
         self.fFirstBackendInit = False
 
-        # stop webserver
-        self.stopAndWaitForWebServer()
-
-        # crashed while stopping, ignore
-        if error == QProcess.Crashed and self.fStoppingBackend:
+        # crashes are handled when the process finishes
+        if error == QProcess.Crashed:
             return
 
+        # can't be started, no point in trying again
+        self.fBackendSupervisor.reset()
+
+        # hot restart failed, go back to the intro page
+        if self.fHotRestarting:
+            self.fHotRestarting = False
+            self.slot_backendFinished(-1, -1)
+
+        # stop webserver
+        self.stopWebServer()
+
         errorStr = self.tr("Could not start host backend.\n") + self.getProcessErrorAsString(error)
         qWarning(errorStr)
 
+        # 'finished' is not emitted if the process didn't start, startup can't go any further
+        self.startupStageEnd("backend")
+
+        if error == QProcess.FailedToStart:
+            self.startupStagesFinished()
+            self.ui.label_progress.setText(self.tr("Could not start host backend"))
+
         # don't show error if this is the first time starting the host or using live-iso
         if firstBackendInit or USING_LIVE_ISO:
             return
@@ -612,32 +1079,39 @@ class HostWindow(QMainWindow):
 
     @pyqtSlot()
     def slot_backendRead(self):
-        #if self.fProccessBackend.state() != QProcess.Running:
-            #return
-
-        for line in str(self.fProccessBackend.readAllStandardOutput().trimmed(), encoding="utf-8", errors="ignore").strip().split("\n"):
-            line = line.replace("\x1b[0m","").replace("\x1b[0;31m","").replace("\x1b[0;33m","").strip()
-            if not line:
-                continue
+        # parsing is done in the log reader thread
+        self.fBackendLogReader.feed(bytes(self.fProccessBackend.readAllStandardOutput()))
 
-            if self.fSavedSettings[MOD_KEY_HOST_VERBOSE]:
-                print("BACKEND:", line)
+    @pyqtSlot(str)
+    def slot_backendLogError(self, line):
+        # already printed in verbose mode
+        if self.fSavedSettings[MOD_KEY_HOST_VERBOSE]:
+            return
 
-            if line == "mod-host ready!" or line == "mod-host is running.":
-                QTimer.singleShot(0, self.slot_backendStartPhase2)
-            #elif "Listening on socket " in line:
-                #QTimer.singleShot(1000, self.slot_ingenStarted)
-            ##elif "Activated Jack client " in line:
-                ##QTimer.singleShot(1000, self.fWebServerThread.start)
-            #elif "Failed to create UNIX socket" in line or "Could not activate Jack client" in line:
-                ## need to wait for ingen to create sockets so it can delete them on termination
-                #QTimer.singleShot(1000, self.slot_ingenStartError)
+        qWarning("BACKEND: %s" % line)
 
     @pyqtSlot()
     def slot_backendStartPhase2(self):
+        STARTUP_PROFILER.end("backend start")
+        self.startupStageEnd("backend")
+
         if self.fProccessBackend.state() == QProcess.NotRunning:
             return
 
+        self.fBackendSupervisor.backendReady()
+
+        # started after the main backend so it doesn't slow it down
+        if USING_STANDBY_BACKEND:
+            self.fStandbyBackend.start(self.getHostPath())
+
+        if webserver is None:
+            self.fBackendReadyPending = True
+            return
+
+        if self.fHotRestarting:
+            self.hotRestartBackendPhase2()
+            return
+
         if not self.fNeedsSessionReconnect:
             # we'll need it for next time
             self.fNeedsSessionReconnect = True
@@ -645,11 +1119,63 @@ class HostWindow(QMainWindow):
             # we need it now
             SESSION.reconnectApp()
 
-        self.fWebServerThread.start()
+        self.fWebServerThread.startAndPrepare()
+        self.fWebServerThread.setBackendReady()
+
+    @pyqtSlot()
+    def slot_backendRecover(self):
+        print("restarting backend after crash...")
+        self.slot_backendStart()
+
+    @pyqtSlot(float)
+    def slot_backendRecovered(self, elapsed):
+        print("backend recovered from crash in %.3f seconds" % elapsed)
+
+    def hotRestartBackendPhase2(self):
+        self.fHotRestarting = False
+
+        # the webserver is running, do the reconnect on its thread
+        from tornado.ioloop import IOLoop
+        IOLoop.instance().add_callback(SESSION.reconnectApp)
+
+        self.ui.act_backend_start.setEnabled(False)
+        self.ui.act_backend_stop.setEnabled(True)
+        self.ui.act_backend_restart.setEnabled(True)
+        self.ui.label_progress.setText("")
+
+        # the new backend starts empty, make the page match it
+        if self.fWebFrame is not None:
+            if self.fCurrentBundle:
+                self.ui.webpage.bridge().loadPedalboard.emit(self.fCurrentBundle)
+            else:
+                self.ui.webpage.bridge().resetPedalboard.emit()
+
+        print("hot restart of backend finished")
+
+    # --------------------------------------------------------------------------------------------------------
+    # Standby Backend
+
+    # Prewarm @a bundle in the standby backend, if in use
+    def prewarmPedalboard(self, bundle):
+        if not USING_STANDBY_BACKEND:
+            return
+
+        pedalboard = self.fPedalboardIndex.getPedalboard(bundle)
+
+        if pedalboard is None:
+            return
+
+        self.fStandbyBackend.prewarm(pedalboard['bundle'], pedalboard['plugins'])
+
+    @pyqtSlot(str)
+    def slot_standbyPrewarmed(self, bundle):
+        print("standby backend prewarmed", bundle)
+
+    # --------------------------------------------------------------------------------------------------------
 
     @pyqtSlot()
     def slot_backendStartError(self):
-        self.stopAndWaitForBackend()
+        self.stopBackend()
         self.slot_backendError(-2)
 
     # --------------------------------------------------------------------------------------------------------
@@ -657,6 +1183,10 @@ class HostWindow(QMainWindow):
 
     @pyqtSlot()
     def slot_webServerRunning(self):
+        self.setupWebView()
+        self.setupWebViewNetwork()
+        self.startupStagesFinished()
+
         try:
             self.ui.webview.loadStarted.connect(self.slot_webviewLoadStarted)
             self.ui.webview.loadProgress.connect(self.slot_webviewLoadProgress)
@@ -665,10 +1195,17 @@ class HostWindow(QMainWindow):
             pass
 
         print("webserver running")
+        STARTUP_PROFILER.begin("webview load")
+        self.waitForPageReady()
         self.ui.webview.load(QUrl(config["addr"]))
 
     @pyqtSlot()
     def slot_webServerFinished(self):
+        self.fWebServerTerminateTimer.stop()
+
+        # already finished, this returns right away
+        self.fWebServerThread.wait()
+
         try:
             self.ui.webview.loadStarted.connect(self.slot_webviewLoadStarted)
             self.ui.webview.loadProgress.connect(self.slot_webviewLoadProgress)
@@ -677,10 +1214,14 @@ class HostWindow(QMainWindow):
             pass
 
         print("webserver finished")
+
         # testing red color for server finished
-        self.ui.webview.blockSignals(True)
-        self.ui.webview.setHtml("<html><body bgcolor='red'></body></html>")
-        self.ui.webview.blockSignals(False)
+        if self.ui.webview is not None:
+            self.ui.webview.blockSignals(True)
+            self.ui.webview.setHtml("<html><body bgcolor='red'></body></html>")
+            self.ui.webview.blockSignals(False)
+
+        self.checkStopped()
 
     # --------------------------------------------------------------------------------------------------------
     # Web View
@@ -696,6 +1237,8 @@ class HostWindow(QMainWindow):
 
     @pyqtSlot(bool)
     def slot_webviewLoadFinished(self, ok):
+        STARTUP_PROFILER.end("webview load")
+
         self.ui.webview.loadStarted.disconnect(self.slot_webviewLoadStarted)
         self.ui.webview.loadProgress.disconnect(self.slot_webviewLoadProgress)
         self.ui.webview.loadFinished.disconnect(self.slot_webviewLoadFinished)
@@ -711,8 +1254,9 @@ class HostWindow(QMainWindow):
             # for js evaulation
             self.fWebFrame = self.ui.webpage.currentFrame()
 
-            # postpone app stuff
-            QTimer.singleShot(100, self.slot_webviewPostFinished)
+            # app stuff happens once the page is ready too
+            self.fPageReadyTimer.start()
+            self.checkWebviewReady()
 
         else:
             # message
@@ -732,26 +1276,72 @@ class HostWindow(QMainWindow):
 
             # stop js evaulation
             self.fWebFrame = None
+            self.fWaitingForPageReady = False
+            self.fPageReadyTimer.stop()
 
             # stop backend&server
-            self.stopAndWaitForWebServer()
-            self.stopAndWaitForBackend()
+            self.stopWebServer()
+            self.stopBackend()
+
+            STARTUP_PROFILER.finish()
 
         print("load finished")
 
+    def waitForPageReady(self):
+        self.fWaitingForPageReady = True
+        self.fPageReady           = False
+        self.fPageReadyTimer.stop()
+
+        # the new page will push its own state
+        self.fCloudLoggedIn = False
+        self.ui.act_pedalboard_share.setEnabled(False)
+
     @pyqtSlot()
-    def slot_webviewPostFinished(self):
+    def slot_webviewPageReady(self):
+        # placeholder pages are ready too, ignore them
+        if not self.fWaitingForPageReady:
+            return
+
+        self.fPageReady = True
+        self.checkWebviewReady()
+
+    @pyqtSlot()
+    def slot_webviewPageReadyTimeout(self):
+        if not self.fWaitingForPageReady:
+            return
+
+        qWarning("Page didn't report being ready in time, showing it anyway")
+        self.fPageReady = True
+        self.checkWebviewReady()
+
+    @pyqtSlot(str, object)
+    def slot_webviewPageStateChanged(self, name, value):
+        if name == "cloudLoggedIn":
+            self.fCloudLoggedIn = bool(value)
+            self.ui.act_pedalboard_share.setEnabled(self.fCloudLoggedIn)
+
+    # Continue once the page is both loaded and ready, in whatever order that happens
+    def checkWebviewReady(self):
+        if not (self.fWaitingForPageReady and self.fPageReady and self.fWebFrame is not None):
+            return
+
+        self.fWaitingForPageReady = False
+        self.fPageReady           = False
+        self.fPageReadyTimer.stop()
+
         if self.fNextBundle:
             bundle = self.fNextBundle
             self.fNextBundle = ""
-            self.fWebFrame.evaluateJavaScript("desktop.loadPedalboard(\"%s\")" % bundle)
+            self.ui.webpage.bridge().loadPedalboard.emit(bundle)
 
-        QTimer.singleShot(0, self.slot_webviewPostFinished2)
-
-    @pyqtSlot()
-    def slot_webviewPostFinished2(self):
         self.ui.stackedwidget.setCurrentIndex(1)
 
+        if self.fShowInspectorWhenReady:
+            self.fShowInspectorWhenReady = False
+            self.ui.webinspector.show()
+
+        STARTUP_PROFILER.finish()
+
     # --------------------------------------------------------------------------------------------------------
     # Settings
 
@@ -760,8 +1350,7 @@ class HostWindow(QMainWindow):
         settings.setValue("Geometry", self.saveGeometry())
 
     def loadSettings(self, firstTime):
-        qsettings   = QSettings()
-        websettings = self.ui.webview.settings()
+        qsettings = QSettings()
 
         self.fSavedSettings = {
             # Main
@@ -776,26 +1365,33 @@ class HostWindow(QMainWindow):
             MOD_KEY_WEBVIEW_SHOW_INSPECTOR: qsettings.value(MOD_KEY_WEBVIEW_SHOW_INSPECTOR, MOD_DEFAULT_WEBVIEW_SHOW_INSPECTOR, type=bool)
         }
 
-        inspectorEnabled = self.fSavedSettings[MOD_KEY_WEBVIEW_INSPECTOR] and not USING_LIVE_ISO
-
-        websettings.setAttribute(QWebSettings.DeveloperExtrasEnabled, inspectorEnabled)
-
         if firstTime:
             if qsettings.contains("Geometry"):
                 self.restoreGeometry(qsettings.value("Geometry", ""))
             else:
                 self.setWindowState(self.windowState() | Qt.WindowMaximized)
 
-            if inspectorEnabled and self.fSavedSettings[MOD_KEY_WEBVIEW_SHOW_INSPECTOR]:
-                QTimer.singleShot(1000, self.ui.webinspector.show)
-
-        self.ui.act_file_inspect.setVisible(inspectorEnabled)
+        if self.ui.webview is not None:
+            self.applyWebViewSettings()
 
         if self.fIdleTimerId != 0:
             self.killTimer(self.fIdleTimerId)
 
         self.fIdleTimerId = self.startTimer(self.fSavedSettings[MOD_KEY_MAIN_REFRESH_INTERVAL])
 
+        self.fBackendLogReader.setVerbose(self.fSavedSettings[MOD_KEY_HOST_VERBOSE])
+
+    # Returns true if the web inspector is enabled
+    def applyWebViewSettings(self):
+        from mod_webview import QWebSettings
+
+        inspectorEnabled = self.fSavedSettings[MOD_KEY_WEBVIEW_INSPECTOR] and not USING_LIVE_ISO
+
+        self.ui.webview.settings().setAttribute(QWebSettings.DeveloperExtrasEnabled, inspectorEnabled)
+        self.ui.act_file_inspect.setVisible(inspectorEnabled)
+
+        return inspectorEnabled
+
     # --------------------------------------------------------------------------------------------------------
     # Misc
 
@@ -813,12 +1409,33 @@ class HostWindow(QMainWindow):
     # Qt events
 
     def closeEvent(self, event):
+        # stop backend, webserver and background threads first, the window is closed again once they are stopped
+        if not self.isStopped():
+            if not self.fClosing:
+                self.fClosing = True
+                self.fPedalboardIndexThread.cancel()
+
+                if self.fSetListThread is not None:
+                    self.fSetListThread.cancel()
+
+                self.slot_backendStop(True)
+
+            event.ignore()
+            return
+
         if self.fIdleTimerId != 0:
             self.killTimer(self.fIdleTimerId)
             self.fIdleTimerId = 0
 
         self.saveSettings()
-        self.slot_backendStop(True)
+
+        if USING_UNIX_SOCKET:
+            try:
+                os.remove(getWebServerUnixSocketPath())
+            except OSError:
+                pass
+
+        self.fBackendLogReader.stopWait()
 
         QMainWindow.closeEvent(self, event)
 
@@ -853,6 +1470,8 @@ class HostWindow(QMainWindow):
         return self.tr("Unkown error.")
 
     def fixWebViewSize(self):
+        if self.ui.webview is None:
+            return
         if self.ui.stackedwidget.currentIndex() == 1:
             return
 
@@ -861,6 +1480,73 @@ class HostWindow(QMainWindow):
         self.ui.webview.resize(size)
         self.ui.webpage.setViewportSize(size)
 
+    # Stop the backend without blocking, killing it if it doesn't stop in time
+    def stopBackend(self):
+        if self.fProccessBackend.state() == QProcess.NotRunning:
+            return
+
+        self.fStoppingBackend = True
+        self.fProccessBackend.terminate()
+        self.fBackendKillTimer.start()
+
+    # Stop the webserver without blocking, terminating its thread if it doesn't stop in time
+    def stopWebServer(self):
+        if not self.fWebServerThread.isRunning():
+            return
+
+        self.fWebServerThread.stop()
+        self.fWebServerTerminateTimer.start()
+
+    @pyqtSlot()
+    def slot_backendKill(self):
+        if self.fProccessBackend.state() == QProcess.NotRunning:
+            return
+
+        qWarning("Backend failed top stop cleanly, forced kill")
+        self.fProccessBackend.kill()
+
+    @pyqtSlot()
+    def slot_webServerTerminate(self):
+        if not self.fWebServerThread.isRunning():
+            return
+
+        qWarning("WebServer Thread failed top stop cleanly, forced terminate")
+        self.fWebServerThread.terminate()
+
+    # Continue with a pending restart or close, once everything it needs is stopped
+    def checkStopped(self):
+        if self.fProccessBackend.state() != QProcess.NotRunning:
+            return
+
+        if self.fStartBackendWhenStopped:
+            if self.fHotRestarting or not self.fWebServerThread.isRunning():
+                self.fStartBackendWhenStopped = False
+                self.slot_backendStart()
+            return
+
+        if self.fClosing and self.isStopped():
+            self.close()
+
+    # Backend, webserver and all background threads are stopped, it's not safe to destroy a running thread
+    def isStopped(self):
+        if self.fProccessBackend.state() != QProcess.NotRunning or self.fWebServerThread.isRunning():
+            return False
+        if self.fPedalboardIndexThread.isRunning() or self.fModUiImportThread.isRunning():
+            return False
+        if self.fSetListThread is not None and self.fSetListThread.isRunning():
+            return False
+
+        return True
+
+    def getHostPath(self):
+        hostPath = self.fSavedSettings[MOD_KEY_HOST_PATH]
+
+        if hostPath.endswith("ingen"):
+            return MOD_DEFAULT_HOST_PATH
+
+        return hostPath
+
+    # Blocking versions of the above, for when there's no event loop anymore
     def stopAndWaitForBackend(self):
         if self.fProccessBackend.state() == QProcess.NotRunning:
             return
@@ -0,0 +1,899 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# MOD-App
+# Copyright (C) 2014-2015 Filipe Coelho <falktx@falktx.com>
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 3 of
+# the License, or any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# For a full copy of the GNU General Public License see the LICENSE file.
+
+# ------------------------------------------------------------------------------------------------------------
+# Imports (Custom)
+
+from mod_bundlecache import getCachedBundleInfo, VersionedFileDirectory
+from mod_common import *
+
+# ------------------------------------------------------------------------------------------------------------
+# Imports (Global)
+
+import json
+import re
+
+from bisect import bisect_left
+from collections import OrderedDict
+from hashlib import sha1
+from threading import Condition, Event, Lock
+
+if using_Qt4:
+    from PyQt4.QtCore import pyqtSignal, pyqtSlot, Qt, QAbstractListModel, QFileSystemWatcher, QModelIndex
+    from PyQt4.QtCore import QObject, QSize, QThread, QTimer, QUrl
+    from PyQt4.QtGui import QSortFilterProxyModel
+    from PyQt4.QtGui import QImage
+else:
+    from PyQt5.QtCore import pyqtSignal, pyqtSlot, Qt, QAbstractListModel, QFileSystemWatcher, QModelIndex
+    from PyQt5.QtCore import QObject, QSize, QSortFilterProxyModel, QThread, QTimer, QUrl
+    from PyQt5.QtGui import QImage
+
+# ------------------------------------------------------------------------------------------------------------
+# Pedalboard bundle helpers
+
+# Bump this whenever the format of the stored entries changes
+PEDALBOARD_INDEX_VERSION = 3
+
+# Signature of a bundle, changes whenever any of its turtle files is added, removed or modified.
+# Only file metadata is used, so checking a bundle costs a single directory listing.
+def getBundleSignature(bundle):
+    files = []
+
+    for name in os.listdir(bundle):
+        if not name.endswith(".ttl"):
+            continue
+        stat = os.stat(os.path.join(bundle, name))
+        files.append("%s:%i:%i" % (name, stat.st_mtime_ns, stat.st_size))
+
+    files.sort()
+    return sha1("\n".join(files).encode("utf-8", errors="ignore")).hexdigest()
+
+# Find all pedalboard bundles directly inside @a directory
+def getPedalboardBundlesInDirectory(directory):
+    bundles = []
+
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        return bundles
+
+    for name in names:
+        bundle = os.path.abspath(os.path.join(directory, name))
+        if name.endswith(".pedalboard") and os.path.isdir(bundle):
+            bundles.append(bundle)
+
+    return bundles
+
+# Split paths reported by a file system watcher into the bundles and directories they belong to
+def splitChangedPaths(paths):
+    bundles     = set()
+    directories = set()
+
+    for path in paths:
+        if path.endswith(".ttl"):
+            bundles.add(os.path.dirname(path))
+        elif path.endswith(".pedalboard"):
+            bundles.add(path)
+        else:
+            directories.add(path)
+
+    return (sorted(bundles), sorted(directories))
+
+# Directory where mod-ui saves pedalboards, created if needed so it can be watched before the first one is saved
+def getUserPedalboardsDirectory():
+    try:
+        from mod.settings import LV2_PEDALBOARDS_DIR
+        directory = LV2_PEDALBOARDS_DIR
+    except ImportError:
+        directory = os.path.expanduser("~/.pedalboards/")
+
+    directory = os.path.abspath(directory)
+
+    try:
+        os.makedirs(directory, exist_ok=True)
+    except OSError:
+        pass
+
+    return directory
+
+# Relative turtle file references in a manifest
+PEDALBOARD_TURTLE_REF = re.compile(r"<([^<>:/]+\.ttl)>")
+
+# Find the pedalboard's turtle file, as listed in the bundle's manifest.
+# It's named after the title when saved, so it can differ from the bundle name.
+def getPedalboardTurtle(bundle):
+    try:
+        with open(os.path.join(bundle, "manifest.ttl"), "r", encoding="utf-8", errors="ignore") as fh:
+            manifest = fh.read()
+    except (IOError, OSError):
+        manifest = ""
+
+    for name in PEDALBOARD_TURTLE_REF.findall(manifest):
+        if name != "manifest.ttl" and os.path.isfile(os.path.join(bundle, name)):
+            return os.path.join(bundle, name)
+
+    name = os.path.splitext(os.path.basename(bundle.rstrip(os.sep)))[0]
+    return os.path.join(bundle, name + ".ttl")
+
+# plugins might be given as dicts or plain URIs, depending on the mod-ui version
+def getPluginURIs(plugins):
+    return sorted(set(plugin['uri'] if isinstance(plugin, dict) else plugin for plugin in plugins))
+
+# Create a pedalboard list entry (same format as mod-ui's get_all_pedalboards()) for a single bundle
+def getPedalboardEntry(bundle):
+    from mod.utils import get_pedalboard_info
+
+    info = getCachedBundleInfo(bundle, "mod-ui:pedalboard", get_pedalboard_info)
+    name = os.path.basename(bundle.rstrip(os.sep))
+
+    return {
+        'uri':     QUrl.fromLocalFile(getPedalboardTurtle(bundle)).toString(),
+        'bundle':  bundle,
+        'title':   info.get('title', info.get('name', "")) or os.path.splitext(name)[0],
+        'author':  info.get('author', "") or "",
+        'plugins': getPluginURIs(info.get('plugins', [])),
+    }
+
+# Same as getPedalboardEntry(), from an entry of mod-ui's get_all_pedalboards() instead of parsing the bundle.
+# Returns None if mod-ui's entry doesn't have everything we need.
+def getPedalboardEntryFromModUi(pedalboard):
+    if 'plugins' not in pedalboard or not pedalboard.get('uri', None):
+        return None
+
+    bundle = os.path.abspath(pedalboard['bundle'])
+    name   = os.path.basename(bundle.rstrip(os.sep))
+
+    return {
+        'uri':     pedalboard['uri'],
+        'bundle':  bundle,
+        'title':   pedalboard.get('title', pedalboard.get('name', "")) or os.path.splitext(name)[0],
+        'author':  pedalboard.get('author', "") or "",
+        'plugins': getPluginURIs(pedalboard['plugins']),
+    }
+
+# ------------------------------------------------------------------------------------------------------------
+# Pedalboard search index, maps lowercase word prefixes to pedalboards
+
+class PedalboardSearchIndex(object):
+    # splits titles, names and URIs into words
+    WORD_SPLITTER = re.compile(r"[\W_]+", re.UNICODE)
+
+    def __init__(self, pedalboards):
+        object.__init__(self)
+
+        self.fPedalboards = pedalboards
+
+        # word -> set of rows
+        words = {}
+
+        for row, pedalboard in enumerate(pedalboards):
+            text = " ".join([pedalboard['title'], pedalboard.get('author', "")] + pedalboard.get('plugins', []))
+
+            for word in self.splitWords(text):
+                words.setdefault(word, set()).add(row)
+
+        self.fWords    = sorted(words.keys())
+        self.fWordRows = [words[word] for word in self.fWords]
+
+    def splitWords(self, text):
+        return [word for word in self.WORD_SPLITTER.split(text.lower()) if word]
+
+    def pedalboards(self):
+        return self.fPedalboards
+
+    # Rows matching every word of @a text as a prefix of some indexed word, None if @a text is empty
+    def search(self, text):
+        query = self.splitWords(text)
+
+        if len(query) == 0:
+            return None
+
+        rows = None
+
+        for prefix in query:
+            matches = set()
+            index   = bisect_left(self.fWords, prefix)
+
+            while index < len(self.fWords) and self.fWords[index].startswith(prefix):
+                matches |= self.fWordRows[index]
+                index   += 1
+
+            rows = matches if rows is None else rows & matches
+
+            if not rows:
+                break
+
+        return rows
+
+# ------------------------------------------------------------------------------------------------------------
+# Persistent pedalboard index
+
+class PedalboardIndex(object):
+    def __init__(self, filename):
+        object.__init__(self)
+
+        self.fFilename = filename
+
+        # bundle path -> { 'signature': str, 'pedalboard': dict }
+        # always replaced as a whole, so readers on other threads get a consistent snapshot
+        self.fEntries = {}
+
+        # pedalboards sorted by title, together with their search index
+        self.fSearchIndex = PedalboardSearchIndex([])
+
+    # --------------------------------------------------------------------------------------------------------
+
+    def load(self):
+        try:
+            with open(self.fFilename, "r", encoding="utf-8") as fh:
+                data = json.load(fh)
+        except (IOError, OSError, ValueError):
+            return False
+
+        if not isinstance(data, dict) or data.get('version') != PEDALBOARD_INDEX_VERSION:
+            return False
+
+        self.setEntries(data.get('bundles', {}))
+        return True
+
+    def save(self):
+        data = {
+            'version': PEDALBOARD_INDEX_VERSION,
+            'bundles': self.fEntries,
+        }
+
+        tmpFilename = self.fFilename + ".tmp"
+
+        try:
+            os.makedirs(os.path.dirname(self.fFilename), exist_ok=True)
+            with open(tmpFilename, "w", encoding="utf-8") as fh:
+                json.dump(data, fh)
+            os.replace(tmpFilename, self.fFilename)
+        except (IOError, OSError):
+            print("Failed to save pedalboard index '%s'" % self.fFilename)
+            return False
+
+        return True
+
+    # --------------------------------------------------------------------------------------------------------
+
+    def pedalboards(self):
+        return self.fSearchIndex.pedalboards()
+
+    def searchIndex(self):
+        return self.fSearchIndex
+
+    def bundles(self):
+        return list(self.fEntries.keys())
+
+    # Returns the pedalboard entry of @a bundle, None if not in the index
+    def getPedalboard(self, bundle):
+        entry = self.fEntries.get(os.path.abspath(bundle), None)
+
+        if entry is None:
+            return None
+
+        return entry['pedalboard']
+
+    # directories where pedalboards are known to live, used to discover new bundles
+    def directories(self):
+        return sorted(set(os.path.dirname(bundle) for bundle in self.fEntries))
+
+    def setEntries(self, entries):
+        pedalboards = sorted((entry['pedalboard'] for entry in entries.values()), key=lambda pb: pb['title'].lower())
+
+        self.fEntries     = entries
+        self.fSearchIndex = PedalboardSearchIndex(pedalboards)
+
+    # --------------------------------------------------------------------------------------------------------
+
+    # Check all known bundles plus any new ones next to them, only parsing those that changed.
+    # Stops early if the @a cancel event is set, leaving the index as it was.
+    # Returns true if the index was modified.
+    def revalidate(self, cancel=None):
+        oldEntries = self.fEntries
+        newEntries = {}
+
+        # entries to compare bundles against, only parsing those that differ
+        knownEntries = oldEntries
+
+        if len(oldEntries) == 0:
+            # nothing known yet, ask mod-ui for a full scan to find where pedalboards are (can't be cancelled).
+            # its entries are used as they are when possible, instead of parsing everything a second time
+            from mod.utils import get_all_pedalboards
+
+            bundles      = []
+            knownEntries = {}
+
+            for pedalboard in get_all_pedalboards():
+                bundle = os.path.abspath(pedalboard['bundle'])
+                entry  = getPedalboardEntryFromModUi(pedalboard)
+                bundles.append(bundle)
+
+                if entry is None:
+                    continue
+
+                try:
+                    knownEntries[bundle] = { 'signature': getBundleSignature(bundle), 'pedalboard': entry }
+                except OSError:
+                    pass
+        else:
+            bundles = list(oldEntries.keys())
+
+        directories = set(os.path.dirname(bundle) for bundle in bundles)
+
+        for directory in directories:
+            bundles += getPedalboardBundlesInDirectory(directory)
+
+        for bundle in set(bundles):
+            if cancel is not None and cancel.is_set():
+                return False
+
+            entry = self.getUpdatedEntry(bundle, knownEntries.get(bundle, None))
+
+            if entry is not None:
+                newEntries[bundle] = entry
+
+        if newEntries == oldEntries:
+            return False
+
+        self.setEntries(newEntries)
+        return True
+
+    # Re-check a single bundle, adding or removing it from the index as needed.
+    # Returns true if the index was modified.
+    def updateBundle(self, bundle):
+        bundle   = os.path.abspath(bundle)
+        oldEntry = self.fEntries.get(bundle, None)
+        newEntry = self.getUpdatedEntry(bundle, oldEntry) if os.path.isdir(bundle) else None
+
+        if newEntry is oldEntry:
+            return False
+
+        entries = dict(self.fEntries)
+
+        if newEntry is None:
+            entries.pop(bundle)
+        else:
+            entries[bundle] = newEntry
+
+        self.setEntries(entries)
+        return True
+
+    # Re-check which bundles exist inside @a directory, without touching the unchanged ones.
+    # Returns true if the index was modified.
+    def updateDirectory(self, directory):
+        directory = os.path.abspath(directory)
+        bundles   = set(getPedalboardBundlesInDirectory(directory))
+        bundles.update(bundle for bundle in self.fEntries if os.path.dirname(bundle) == directory)
+
+        changed = False
+
+        for bundle in bundles:
+            if self.updateBundle(bundle):
+                changed = True
+
+        return changed
+
+    # Re-check the bundles and directories of the changed @a paths, as reported by PedalboardWatcher.
+    # Stops early if the @a cancel event is set. Returns true if the index was modified.
+    def updatePaths(self, paths, cancel=None):
+        bundles, directories = splitChangedPaths(paths)
+
+        changed = False
+
+        for path in directories + bundles:
+            if cancel is not None and cancel.is_set():
+                break
+
+            if path in directories:
+                if self.updateDirectory(path):
+                    changed = True
+            elif self.updateBundle(path):
+                changed = True
+
+        return changed
+
+    # Returns the (possibly cached) entry for @a bundle, or None if it's not a valid pedalboard anymore
+    def getUpdatedEntry(self, bundle, oldEntry):
+        try:
+            signature = getBundleSignature(bundle)
+        except OSError:
+            return None
+
+        if oldEntry is not None and oldEntry['signature'] == signature:
+            return oldEntry
+
+        try:
+            pedalboard = getPedalboardEntry(bundle)
+        except:
+            print("Failed to get pedalboard info for '%s'" % bundle)
+            return None
+
+        return {
+            'signature':  signature,
+            'pedalboard': pedalboard,
+        }
+
+# ------------------------------------------------------------------------------------------------------------
+# Pedalboard Index Thread, revalidates the index in the background
+
+class PedalboardIndexThread(QThread):
+    # signals
+    updated = pyqtSignal()
+
+    def __init__(self, parent, index):
+        QThread.__init__(self, parent)
+
+        self.fIndex  = index
+        self.fLoaded = False
+        self.fCancel = Event()
+        self.fPaths  = []
+
+    # Stop the current revalidation early, without blocking. Nothing is saved then.
+    def cancel(self):
+        self.fCancel.set()
+
+    # Only re-check what changed in @a paths instead of revalidating everything, must not be running
+    def startUpdate(self, paths):
+        self.fPaths = list(paths)
+        self.start()
+
+    def run(self):
+        paths = self.fPaths
+        self.fPaths = []
+
+        if paths:
+            if not self.fIndex.updatePaths(paths, self.fCancel):
+                return
+
+            self.fIndex.save()
+            self.updated.emit()
+            return
+
+        # the saved index is read here too, so it doesn't delay startup
+        if not self.fLoaded:
+            self.fLoaded = True
+
+            if self.fIndex.load():
+                self.updated.emit()
+
+        if not self.fIndex.revalidate(self.fCancel):
+            return
+
+        self.fIndex.save()
+        self.updated.emit()
+
+# ------------------------------------------------------------------------------------------------------------
+# Pedalboard Watcher, patches the index when pedalboard files change on disk
+#
+# Changes are collected here and handed to the index thread, which only re-checks the affected bundles.
+# Once it's done, only the watched paths of those bundles and directories are updated.
+
+class PedalboardWatcher(QObject):
+    # how long to wait for more changes before updating the index, in ms
+    UPDATE_DELAY = 250
+
+    def __init__(self, parent, index, indexThread):
+        QObject.__init__(self, parent)
+
+        self.fIndex         = index
+        self.fIndexThread   = indexThread
+        self.fUserDirectory = getUserPedalboardsDirectory()
+
+        # paths that changed since the last update, and the ones being updated by the index thread
+        self.fDirtyPaths    = set()
+        self.fUpdatingPaths = None
+
+        self.fWatcher = QFileSystemWatcher(self)
+        self.fWatcher.directoryChanged.connect(self.slot_pathChanged)
+        self.fWatcher.fileChanged.connect(self.slot_pathChanged)
+
+        self.fTimer = QTimer(self)
+        self.fTimer.setInterval(self.UPDATE_DELAY)
+        self.fTimer.setSingleShot(True)
+        self.fTimer.timeout.connect(self.slot_updateIndex)
+
+        self.fIndexThread.finished.connect(self.slot_indexThreadFinished)
+
+    # Make the watched paths match the current index contents.
+    # Pedalboard directories, all bundles inside them and their turtle files are watched.
+    # mod-ui's pedalboard directory is always watched, so new pedalboards show up even if there are none yet.
+    # If @a directories and @a bundles are given, only the paths inside those are synced.
+    def syncWatchedPaths(self, directories=None, bundles=None):
+        full = directories is None and bundles is None
+
+        if full:
+            directories = set(self.fIndex.directories())
+            directories.add(self.fUserDirectory)
+            bundles = []
+
+        paths = set()
+
+        for directory in directories:
+            if not os.path.isdir(directory):
+                continue
+
+            paths.add(directory)
+            bundles = list(bundles) + getPedalboardBundlesInDirectory(directory)
+
+        for bundle in bundles:
+            try:
+                names = os.listdir(bundle)
+            except OSError:
+                continue
+
+            paths.add(bundle)
+            paths.update(os.path.join(bundle, name) for name in names if name.endswith(".ttl"))
+
+        watched = set(self.fWatcher.directories() + self.fWatcher.files())
+
+        if not full:
+            # only what is inside the synced directories and bundles
+            prefixes = tuple(os.path.join(path, "") for path in list(directories) + list(bundles))
+            watched  = set(path for path in watched if path in paths or os.path.join(path, "").startswith(prefixes))
+
+        if watched - paths:
+            self.fWatcher.removePaths(list(watched - paths))
+        if paths - watched:
+            self.fWatcher.addPaths(list(paths - watched))
+
+    @pyqtSlot(str)
+    def slot_pathChanged(self, path):
+        self.fDirtyPaths.add(path)
+        self.fTimer.start()
+
+    @pyqtSlot()
+    def slot_updateIndex(self):
+        # the background thread owns the index while it runs, try again later
+        if self.fIndexThread.isRunning():
+            self.fTimer.start()
+            return
+
+        self.fUpdatingPaths = self.fDirtyPaths
+        self.fDirtyPaths    = set()
+
+        self.fIndexThread.startUpdate(self.fUpdatingPaths)
+
+    @pyqtSlot()
+    def slot_indexThreadFinished(self):
+        paths = self.fUpdatingPaths
+        self.fUpdatingPaths = None
+
+        # full revalidation
+        if paths is None:
+            self.syncWatchedPaths()
+            return
+
+        # new bundles and files need to be watched too, and removed ones were dropped by Qt already
+        bundles, directories = splitChangedPaths(paths)
+        self.syncWatchedPaths(directories, bundles)
+
+# ------------------------------------------------------------------------------------------------------------
+# Thumbnail Cache, icon-sized copies of pedalboard thumbnails
+#
+# Scaled images are kept on disk in a VersionedFileDirectory, the source being the original path and the icon size,
+# and the version its mtime and size. A modified thumbnail maps to a new file, replacing the old one.
+# The most recently used images are also kept in memory.
+# Safe to use from multiple threads.
+
+class ThumbnailCache(object):
+    # number of images kept in memory
+    MAX_MEMORY_ITEMS = 128
+
+    def __init__(self, directory):
+        object.__init__(self)
+
+        self.fFiles       = VersionedFileDirectory(directory, ".png")
+        self.fSize        = QSize()
+        self.fPlaceholder = QImage()
+        self.fLock        = Lock()
+
+        # filename -> (key, QImage), least recently used first
+        self.fMemory = OrderedDict()
+
+    # Set the icon size, must be called before loading any images
+    def setSize(self, size):
+        self.fSize = QSize(size)
+
+        if self.fPlaceholder.size() == self.fSize:
+            return
+
+        self.fPlaceholder = QImage(self.fSize, QImage.Format_ARGB32_Premultiplied)
+        self.fPlaceholder.fill(Qt.transparent)
+
+    # Transparent image of the icon size, for thumbnails not loaded yet or missing
+    def placeholder(self):
+        return self.fPlaceholder
+
+    # Get an image from memory only, None if not loaded yet (or if the original file changed since then)
+    def cached(self, filename):
+        key = self.getKey(filename)
+
+        with self.fLock:
+            if filename not in self.fMemory or self.fMemory[filename][0] != key:
+                return None
+
+            self.fMemory.move_to_end(filename)
+            return self.fMemory[filename][1]
+
+    # Get an image from memory, disk cache or the original file, in that order.
+    # Returns a null image if @a filename can't be read.
+    def load(self, filename):
+        image = self.cached(filename)
+
+        if image is not None:
+            return image
+
+        # only reached from loader threads, the GUI thread only uses cached()
+        self.fFiles.pruneUnused()
+
+        key = self.getKey(filename)
+
+        if key is None:
+            image = QImage()
+
+        else:
+            cacheFilename = self.fFiles.getFilename(key)
+            image = QImage(cacheFilename)
+
+            if image.isNull():
+                image = QImage(filename)
+
+                if not image.isNull():
+                    image = image.scaled(self.fSize, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+                    self.fFiles.store(cacheFilename, lambda tmpFilename: image.save(tmpFilename, "PNG"))
+
+            else:
+                self.fFiles.markUsed(cacheFilename)
+
+        # null images are remembered as well, so missing thumbnails are not retried on every repaint
+        with self.fLock:
+            self.fMemory[filename] = (key, image)
+            self.fMemory.move_to_end(filename)
+
+            while len(self.fMemory) > self.MAX_MEMORY_ITEMS:
+                self.fMemory.popitem(last=False)
+
+        return image
+
+    # Cache key of @a filename for the current icon size, None if the file doesn't exist
+    def getKey(self, filename):
+        try:
+            stat = os.stat(filename)
+        except OSError:
+            return None
+
+        source  = "%s:%ix%i" % (filename, self.fSize.width(), self.fSize.height())
+        version = "%i:%i" % (stat.st_mtime_ns, stat.st_size)
+
+        return self.fFiles.getKey(sha1(source.encode("utf-8", errors="ignore")).hexdigest(),
+                                  sha1(version.encode("utf-8")).hexdigest())
+
+# ------------------------------------------------------------------------------------------------------------
+# Thumbnail Loader Thread, decodes pedalboard thumbnails away from the GUI thread
+
+class ThumbnailLoaderThread(QThread):
+    # signals
+    loaded = pyqtSignal(str, QImage)
+
+    # pending requests above this limit are forgotten, oldest first.
+    # they will be requested again if their rows become visible
+    MAX_PENDING = 64
+
+    def __init__(self, parent, cache):
+        QThread.__init__(self, parent)
+
+        self.fCache     = cache
+        self.fCondition = Condition()
+        self.fPending   = []
+        self.fStopping  = False
+
+    # Queue @a bundle for loading, most recent requests are handled first
+    def request(self, bundle):
+        with self.fCondition:
+            if bundle in self.fPending:
+                self.fPending.remove(bundle)
+            elif len(self.fPending) >= self.MAX_PENDING:
+                self.fPending.pop(0)
+
+            self.fPending.append(bundle)
+            self.fCondition.notify()
+
+    def stopWait(self):
+        with self.fCondition:
+            self.fStopping = True
+            self.fPending  = []
+            self.fCondition.notify()
+
+        return self.wait()
+
+    def run(self):
+        while True:
+            with self.fCondition:
+                while not (self.fPending or self.fStopping):
+                    self.fCondition.wait()
+
+                if self.fStopping:
+                    return
+
+                bundle = self.fPending.pop()
+
+            self.loaded.emit(bundle, self.fCache.load(os.path.join(bundle, "thumbnail.png")))
+
+# ------------------------------------------------------------------------------------------------------------
+# Pedalboard List Model, thumbnails are only loaded for rows the view asks for (the visible ones)
+
+class PedalboardListModel(QAbstractListModel):
+    # custom roles, Qt.UserRole is the pedalboard URI
+    BundleRole = Qt.UserRole + 1
+
+    def __init__(self, parent, pedalboards, thumbnailCache):
+        QAbstractListModel.__init__(self, parent)
+
+        self.fPedalboards = pedalboards
+        self.fRows        = dict((pedalboard['bundle'], row) for row, pedalboard in enumerate(pedalboards))
+        self.fThumbnails  = thumbnailCache
+
+        self.fLoader = ThumbnailLoaderThread(self, thumbnailCache)
+        self.fLoader.loaded.connect(self.slot_thumbnailLoaded)
+        self.fLoader.start()
+
+    def stopLoader(self):
+        self.fLoader.stopWait()
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.fPedalboards)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+
+        pedalboard = self.fPedalboards[index.row()]
+
+        if role == Qt.DisplayRole:
+            return pedalboard['title']
+
+        if role == Qt.ToolTipRole:
+            return pedalboard['bundle']
+
+        if role == Qt.UserRole:
+            return pedalboard['uri']
+
+        if role == self.BundleRole:
+            return pedalboard['bundle']
+
+        if role == Qt.DecorationRole:
+            bundle = pedalboard['bundle']
+            image  = self.fThumbnails.cached(os.path.join(bundle, "thumbnail.png"))
+
+            # always give an icon-sized image, so all rows get the same size (the view uses uniformItemSizes)
+            if image is None:
+                self.fLoader.request(bundle)
+                return self.fThumbnails.placeholder()
+
+            if image.isNull():
+                return self.fThumbnails.placeholder()
+
+            return image
+
+        return None
+
+    @pyqtSlot(str, QImage)
+    def slot_thumbnailLoaded(self, bundle, image):
+        if bundle not in self.fRows:
+            return
+
+        index = self.index(self.fRows[bundle])
+        self.dataChanged.emit(index, index)
+
+# ------------------------------------------------------------------------------------------------------------
+# Pedalboard Filter Model, only shows the rows given by a PedalboardSearchIndex
+
+class PedalboardFilterModel(QSortFilterProxyModel):
+    def __init__(self, parent, searchIndex):
+        QSortFilterProxyModel.__init__(self, parent)
+
+        self.fSearchIndex = searchIndex
+        self.fRows        = None
+
+    def setSearchText(self, text):
+        self.fRows = self.fSearchIndex.search(text)
+        self.invalidateFilter()
+
+    def filterAcceptsRow(self, sourceRow, sourceParent):
+        return self.fRows is None or sourceRow in self.fRows
+
+# ------------------------------------------------------------------------------------------------------------
+# Set Lists
+#
+# A set list is a text file with one pedalboard bundle per line, relative to the set list's directory.
+# Empty lines and lines starting with '#' are ignored.
+
+def readSetList(filename):
+    bundles = []
+    basedir = os.path.dirname(os.path.abspath(filename))
+
+    with open(filename, "r", encoding="utf-8") as fh:
+        for line in fh:
+            line = line.strip()
+
+            if not line or line.startswith("#"):
+                continue
+
+            bundles.append(os.path.abspath(os.path.join(basedir, os.path.expanduser(line))))
+
+    return bundles
+
+# Read all files of @a bundle once, so they are in the page cache by the time the pedalboard is loaded
+def warmBundleFiles(bundle):
+    for name in os.listdir(bundle):
+        filename = os.path.join(bundle, name)
+
+        if not os.path.isfile(filename):
+            continue
+
+        try:
+            with open(filename, "rb") as fh:
+                while fh.read(1024*1024):
+                    pass
+        except (IOError, OSError):
+            pass
+
+# ------------------------------------------------------------------------------------------------------------
+# Set List Thread, validates and pre-parses all pedalboards of a set list
+
+class SetListThread(QThread):
+    # signals
+    resolved = pyqtSignal(list) # pedalboard entries, in set list order
+
+    def __init__(self, parent, bundles):
+        QThread.__init__(self, parent)
+
+        self.fBundles = bundles
+        self.fCancel  = Event()
+
+    # Stop early, without blocking. Nothing is resolved then.
+    def cancel(self):
+        self.fCancel.set()
+
+    def run(self):
+        entries = []
+
+        for bundle in self.fBundles:
+            if self.fCancel.is_set():
+                return
+
+            if not os.path.isdir(bundle):
+                print("Set list: '%s' is not a pedalboard bundle, skipped" % bundle)
+                continue
+
+            try:
+                entry = getPedalboardEntry(bundle)
+            except Exception as e:
+                print("Set list: failed to parse '%s', skipped:" % bundle, e)
+                continue
+
+            warmBundleFiles(bundle)
+            entries.append(entry)
+
+        self.resolved.emit(entries)
+
+# ------------------------------------------------------------------------------------------------------------
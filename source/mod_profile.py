@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# MOD-App
+# Copyright (C) 2014-2015 Filipe Coelho <falktx@falktx.com>
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 3 of
+# the License, or any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# For a full copy of the GNU General Public License see the LICENSE file.
+
+# ------------------------------------------------------------------------------------------------------------
+# Startup profiler
+#
+# Enabled with '--profile-startup' or '--profile-startup=/path/to/file.json'.
+# Records the startup phases and writes them as a Chrome trace (open with chrome://tracing or Perfetto).
+# This module has no Qt dependencies and must stay cheap to import, it's the first thing mod_common imports.
+
+# ------------------------------------------------------------------------------------------------------------
+# Imports (Global)
+
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+# ------------------------------------------------------------------------------------------------------------
+# Startup Profiler
+
+class StartupProfiler(object):
+    def __init__(self, filename):
+        object.__init__(self)
+
+        self.fFilename = filename
+        self.fEnabled  = bool(filename)
+        self.fEvents   = []
+        self.fLock     = threading.Lock()
+        self.fStart    = time.perf_counter()
+
+    def isEnabled(self):
+        return self.fEnabled
+
+    def addEvent(self, name, phase):
+        if not self.fEnabled:
+            return
+
+        event = {
+            'name': name,
+            'cat':  "startup",
+            'ph':   phase,
+            'ts':   int((time.perf_counter() - self.fStart) * 1000000),
+            'pid':  os.getpid(),
+            'tid':  threading.get_ident(),
+        }
+
+        if phase == "i":
+            event['s'] = "g"
+
+        with self.fLock:
+            self.fEvents.append(event)
+
+    # Mark the start of a phase
+    def begin(self, name):
+        self.addEvent(name, "b")
+
+    # Mark the end of a phase
+    def end(self, name):
+        self.addEvent(name, "e")
+
+    # Mark a single point in time
+    def mark(self, name):
+        self.addEvent(name, "i")
+
+    # Write the trace file, nothing else is recorded after this
+    def finish(self):
+        if not self.fEnabled:
+            return
+
+        self.mark("startup finished")
+        self.fEnabled = False
+
+        with self.fLock:
+            # async events need an id to be paired, use the phase name
+            events = [dict(event, id=event['name']) if event['ph'] in ("b", "e") else event for event in self.fEvents]
+
+        try:
+            with open(self.fFilename, "w", encoding="utf-8") as fh:
+                json.dump({ 'traceEvents': events, 'displayTimeUnit': "ms" }, fh)
+        except (IOError, OSError):
+            print("Failed to write startup profile to '%s'" % self.fFilename)
+            return
+
+        print("Startup profile written to '%s'" % self.fFilename)
+
+# ------------------------------------------------------------------------------------------------------------
+# Global profiler, set up from the command line
+
+def _getStartupProfileFilename():
+    for arg in sys.argv[1:]:
+        if arg == "--profile-startup":
+            return os.path.join(tempfile.gettempdir(), "mod-app-startup-%i.json" % os.getpid())
+        if arg.startswith("--profile-startup="):
+            return arg.split("=", 1)[1]
+
+    return ""
+
+STARTUP_PROFILER = StartupProfiler(_getStartupProfileFilename())
+
+# ------------------------------------------------------------------------------------------------------------
@@ -0,0 +1,571 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# MOD-App
+# Copyright (C) 2014-2015 Filipe Coelho <falktx@falktx.com>
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 3 of
+# the License, or any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# For a full copy of the GNU General Public License see the LICENSE file.
+
+# ------------------------------------------------------------------------------------------------------------
+# Imports (Custom)
+
+from mod_common import *
+
+# ------------------------------------------------------------------------------------------------------------
+# Imports (Global)
+#
+# QtWebKit is slow to load, so this module is only imported once the main window is already visible.
+
+import mimetypes
+import mmap
+
+if using_Qt4:
+    from PyQt4.QtCore import pyqtSignal, pyqtSlot, QIODevice, QObject, QTimer, QUrl
+    from PyQt4.QtNetwork import QLocalSocket, QNetworkAccessManager, QNetworkCookie, QNetworkReply, QNetworkRequest
+    from PyQt4.QtGui import QInputDialog, QLineEdit, QMessageBox
+    from PyQt4.QtWebKit import QWebSettings
+    from PyQt4.QtWebKit import QWebInspector, QWebPage, QWebView
+else:
+    from PyQt5.QtCore import pyqtSignal, pyqtSlot, QIODevice, QObject, QTimer, QUrl
+    from PyQt5.QtNetwork import QLocalSocket, QNetworkAccessManager, QNetworkCookie, QNetworkReply, QNetworkRequest
+    from PyQt5.QtWidgets import QInputDialog, QLineEdit, QMessageBox
+    from PyQt5.QtWebKit import QWebSettings
+    from PyQt5.QtWebKitWidgets import QWebInspector, QWebPage, QWebView
+
+# ------------------------------------------------------------------------------------------------------------
+# Host Bridge, available to the page as 'window.modapp'
+#
+# Signals without the 'page' prefix are requests for the page, connected to by the injected script.
+# The page pushes its state back with pushState(), which is received here as pageStateChanged.
+
+class HostBridge(QObject):
+    # signals (app -> page)
+    loadPedalboard  = pyqtSignal(str)
+    resetPedalboard = pyqtSignal()
+    savePedalboard  = pyqtSignal(bool)
+    sharePedalboard = pyqtSignal()
+
+    # signals (page -> app)
+    pageReady        = pyqtSignal()
+    pageStateChanged = pyqtSignal(str, object)
+
+    def __init__(self, parent):
+        QObject.__init__(self, parent)
+
+    # called by the page once it's fully loaded
+    @pyqtSlot()
+    def desktopReady(self):
+        self.pageReady.emit()
+
+    # called by the page when some of its state changes
+    @pyqtSlot(str, "QVariant")
+    def pushState(self, name, value):
+        self.pageStateChanged.emit(name, value)
+
+# ------------------------------------------------------------------------------------------------------------
+# Host WebPage
+
+class HostWebPage(QWebPage):
+    # connects the bridge requests to the page, and tells it when the page is ready (after its own 'load' handlers).
+    # requests are handled later so the app never waits on the page.
+    BRIDGE_SCRIPT = """
+        (function () {
+            function later(func) {
+                return function () {
+                    var args = arguments
+                    setTimeout(function () { func.apply(null, args) }, 0)
+                }
+            }
+
+            modapp.loadPedalboard.connect(later(function (bundle) { desktop.loadPedalboard(bundle) }))
+            modapp.resetPedalboard.connect(later(function () { desktop.reset() }))
+            modapp.savePedalboard.connect(later(function (saveAs) { desktop.saveCurrentPedalboard(saveAs) }))
+            modapp.sharePedalboard.connect(later(function () { desktop.shareCurrentPedalboard() }))
+
+            window.addEventListener('load', later(function () {
+                // the app waits for desktopReady, so it's called even if something here fails
+                try {
+                    var cloud = document.getElementById('mod-cloud')
+
+                    var pushCloudState = function () {
+                        modapp.pushState('cloudLoggedIn', cloud != null && $(cloud).hasClass('logged'))
+                    }
+
+                    // login state is kept in the class of #mod-cloud, only push it when that changes
+                    if (cloud != null && window.MutationObserver) {
+                        new MutationObserver(pushCloudState).observe(cloud, { attributes: true, attributeFilter: ['class'] })
+                    }
+
+                    pushCloudState()
+                } finally {
+                    modapp.desktopReady()
+                }
+            }))
+        })()
+    """
+
+    def __init__(self, parent):
+        QWebPage.__init__(self, parent)
+
+        self.fBridge = HostBridge(self)
+
+        self.mainFrame().javaScriptWindowObjectCleared.connect(self.slot_javaScriptWindowObjectCleared)
+
+    def bridge(self):
+        return self.fBridge
+
+    @pyqtSlot()
+    def slot_javaScriptWindowObjectCleared(self):
+        frame = self.mainFrame()
+        frame.addToJavaScriptWindowObject("modapp", self.fBridge)
+        frame.evaluateJavaScript(self.BRIDGE_SCRIPT)
+
+    def javaScriptAlert(self, frame, msg):
+        if USING_LIVE_ISO: return
+        QMessageBox.warning(self.parent(),
+                            self.tr("MOD-App Alert"),
+                            msg,
+                            QMessageBox.Ok)
+
+    def javaScriptConfirm(self, frame, msg):
+        if USING_LIVE_ISO: return True
+        return (QMessageBox.question(self.parent(),
+                                     self.tr("MOD-App Confirm"),
+                                     msg,
+                                     QMessageBox.Yes|QMessageBox.No, QMessageBox.No) == QMessageBox.Yes)
+
+    def javaScriptPrompt(self, frame, msg, default):
+        if USING_LIVE_ISO: return True, "live"
+        res, ok = QInputDialog.getText(self.parent(),
+                                       self.tr("MOD-App Prompt"),
+                                       msg,
+                                       QLineEdit.Normal, default)
+        return ok, res
+
+    def shouldInterruptJavaScript(self):
+        if USING_LIVE_ISO: return False
+        return (QMessageBox.question(self.parent(),
+                                     self.tr("MOD-App Problem"),
+                                     self.tr("The script on this page appears to have a problem. Do you want to stop the script?"),
+                                     QMessageBox.Yes|QMessageBox.No, QMessageBox.No) == QMessageBox.Yes)
+
+# ------------------------------------------------------------------------------------------------------------
+# Host Network Reply
+#
+# Base for replies made up here instead of by QNetworkAccessManager, the response body is kept in memory.
+
+class HostNetworkReply(QNetworkReply):
+    # request methods, as used by QNetworkAccessManager
+    VERBS = {
+        QNetworkAccessManager.HeadOperation:   b"HEAD",
+        QNetworkAccessManager.GetOperation:    b"GET",
+        QNetworkAccessManager.PutOperation:    b"PUT",
+        QNetworkAccessManager.PostOperation:   b"POST",
+        QNetworkAccessManager.DeleteOperation: b"DELETE",
+    }
+
+    def __init__(self, parent, operation, request):
+        QNetworkReply.__init__(self, parent)
+
+        self.fBody   = b"" # response body, anything that supports slicing
+        self.fOffset = 0   # how much of the body was read
+        self.fDone   = False
+
+        self.setRequest(request)
+        self.setUrl(request.url())
+        self.setOperation(operation)
+        self.open(QIODevice.ReadOnly | QIODevice.Unbuffered)
+
+    def getVerb(self):
+        if self.operation() == QNetworkAccessManager.CustomOperation:
+            return bytes(self.request().attribute(QNetworkRequest.CustomVerbAttribute))
+
+        return self.VERBS.get(self.operation(), b"GET")
+
+    # Path and query of the request, encoded
+    def getTarget(self):
+        return bytes(self.url().toEncoded(QUrl.RemoveScheme | QUrl.RemoveAuthority | QUrl.RemoveFragment)) or b"/"
+
+    # --------------------------------------------------------------------------------------------------------
+
+    def abort(self):
+        if self.fDone:
+            return
+
+        self.setError(QNetworkReply.OperationCanceledError, "Operation canceled")
+        self.finish()
+
+    def bytesAvailable(self):
+        return len(self.fBody) - self.fOffset + QNetworkReply.bytesAvailable(self)
+
+    def isSequential(self):
+        return True
+
+    def readData(self, maxlen):
+        data = self.fBody[self.fOffset:self.fOffset+maxlen]
+        self.fOffset += len(data)
+        return data
+
+    # --------------------------------------------------------------------------------------------------------
+
+    def setResponseHead(self, status, reason, headers):
+        self.setAttribute(QNetworkRequest.HttpStatusCodeAttribute, status)
+        self.setAttribute(QNetworkRequest.HttpReasonPhraseAttribute, reason)
+
+        for name, value in headers:
+            if name.lower() == b"set-cookie":
+                self.manager().cookieJar().setCookiesFromUrl(QNetworkCookie.parseCookies(value), self.url())
+            else:
+                self.setRawHeader(name, value)
+
+        self.metaDataChanged.emit()
+
+    def appendBody(self, data):
+        if not data or self.fDone:
+            return
+
+        self.fBody   = self.fBody[self.fOffset:] + data
+        self.fOffset = 0
+        self.readyRead.emit()
+
+    def fail(self, error, message):
+        self.setError(error, message)
+        self.error.emit(error)
+        self.finish()
+
+    def finish(self):
+        self.fDone = True
+        self.setFinished(True)
+        self.finished.emit()
+
+# ------------------------------------------------------------------------------------------------------------
+# Unix Socket Reply
+#
+# A single HTTP/1.0 request, the server closes the connection once the response is complete.
+
+class UnixSocketReply(HostNetworkReply):
+    def __init__(self, parent, path, operation, request, body):
+        HostNetworkReply.__init__(self, parent, operation, request)
+
+        self.fHead     = b"" # response head, until complete
+        self.fHeadDone = False
+
+        self.fRequestData = self.getRequestData(body)
+
+        self.fSocket = QLocalSocket(self)
+        self.fSocket.connected.connect(self.slot_socketConnected)
+        self.fSocket.readyRead.connect(self.slot_socketRead)
+        self.fSocket.disconnected.connect(self.slot_socketDisconnected)
+        self.fSocket.error.connect(self.slot_socketError)
+        self.fSocket.connectToServer(path)
+
+    def getRequestData(self, body):
+        request = self.request()
+        url     = request.url()
+        host    = ("%s:%i" % (url.host(), url.port(80))).encode("utf-8")
+
+        lines = [self.getVerb() + b" " + self.getTarget() + b" HTTP/1.0", b"Host: " + host]
+
+        for name in request.rawHeaderList():
+            lines.append(bytes(name) + b": " + bytes(request.rawHeader(name)))
+
+        if body or self.operation() in (QNetworkAccessManager.PutOperation, QNetworkAccessManager.PostOperation):
+            lines.append(b"Content-Length: " + str(len(body)).encode("utf-8"))
+
+        return b"\r\n".join(lines) + b"\r\n\r\n" + body
+
+    def abort(self):
+        self.fSocket.abort()
+        HostNetworkReply.abort(self)
+
+    def parseHead(self, head):
+        lines   = head.split(b"\r\n")
+        status  = lines.pop(0).split(None, 2)
+        headers = []
+
+        for line in lines:
+            name, _, value = line.partition(b":")
+            headers.append((name.strip(), value.strip()))
+
+        code   = int(status[1]) if len(status) >= 2 and status[1].isdigit() else 0
+        reason = status[2] if len(status) >= 3 else b""
+
+        self.setResponseHead(code, reason, headers)
+
+    # --------------------------------------------------------------------------------------------------------
+
+    @pyqtSlot()
+    def slot_socketConnected(self):
+        self.fSocket.write(self.fRequestData)
+        self.fRequestData = b""
+
+    @pyqtSlot()
+    def slot_socketRead(self):
+        data = bytes(self.fSocket.readAll())
+
+        if not self.fHeadDone:
+            self.fHead += data
+
+            if b"\r\n\r\n" not in self.fHead:
+                return
+
+            head, _, data = self.fHead.partition(b"\r\n\r\n")
+            self.fHead     = b""
+            self.fHeadDone = True
+
+            self.parseHead(head)
+
+        self.appendBody(data)
+
+    @pyqtSlot()
+    def slot_socketDisconnected(self):
+        if self.fDone:
+            return
+
+        if not self.fHeadDone:
+            self.fail(QNetworkReply.RemoteHostClosedError, "Connection closed before a response was received")
+            return
+
+        self.finish()
+
+    @pyqtSlot(QLocalSocket.LocalSocketError)
+    def slot_socketError(self, socketError):
+        # end of the response
+        if socketError == QLocalSocket.PeerClosedError or self.fDone:
+            return
+
+        self.fail(QNetworkReply.ConnectionRefusedError, self.fSocket.errorString())
+
+# ------------------------------------------------------------------------------------------------------------
+# Static File Reply, the file is memory-mapped instead of read
+
+class StaticFileReply(HostNetworkReply):
+    def __init__(self, parent, operation, request, filename):
+        HostNetworkReply.__init__(self, parent, operation, request)
+
+        self.fFilename = filename
+
+        # signals can't be emitted before the reply is returned
+        QTimer.singleShot(0, self.slot_respond)
+
+    @pyqtSlot()
+    def slot_respond(self):
+        if self.fDone:
+            return
+
+        try:
+            with open(self.fFilename, "rb") as fh:
+                size = os.fstat(fh.fileno()).st_size
+                # mmap can't map empty files
+                body = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) if size > 0 else b""
+        except (IOError, OSError, ValueError) as e:
+            self.fail(QNetworkReply.ContentNotFoundError, str(e))
+            return
+
+        mimeType = mimetypes.guess_type(self.fFilename)[0] or "application/octet-stream"
+
+        self.setResponseHead(200, b"OK", [(b"Content-Type",   mimeType.encode("utf-8")),
+                                          (b"Content-Length", str(size).encode("utf-8"))])
+
+        if self.operation() != QNetworkAccessManager.HeadOperation and size > 0:
+            self.fBody = body
+            self.readyRead.emit()
+
+        self.finish()
+
+# ------------------------------------------------------------------------------------------------------------
+# In-Process Reply, the request is given to the webserver's tornado application directly
+
+class InProcessReply(HostNetworkReply):
+    # signals, emitted from the webserver thread
+    responseHead = pyqtSignal(int, object, object)
+    responseData = pyqtSignal(object)
+    responseDone = pyqtSignal()
+
+    def __init__(self, parent, operation, request, body, application):
+        HostNetworkReply.__init__(self, parent, operation, request)
+
+        self.responseHead.connect(self.setResponseHead)
+        self.responseData.connect(self.appendBody)
+        self.responseDone.connect(self.slot_responseDone)
+
+        url     = request.url()
+        host    = "%s:%i" % (url.host(), url.port(80))
+        headers = [(str(bytes(name), "latin-1"), str(bytes(request.rawHeader(name)), "latin-1")) for name in request.rawHeaderList()]
+
+        from tornado.ioloop import IOLoop
+        IOLoop.instance().add_callback(dispatchInProcessRequest, application, InProcessConnection(self),
+                                       str(self.getVerb(), "latin-1"), str(self.getTarget(), "latin-1"), host, headers, body)
+
+    @pyqtSlot()
+    def slot_responseDone(self):
+        if self.fDone:
+            return
+
+        self.finish()
+
+# ------------------------------------------------------------------------------------------------------------
+# In-Process Connection
+#
+# Stands in for tornado's HTTP1Connection, passing the response back to the reply.
+# Used from the webserver thread only, the reply is only reached through its (queued) signals.
+
+class InProcessConnection(object):
+    class Context(object):
+        remote_ip = "127.0.0.1"
+        protocol  = "http"
+
+    def __init__(self, reply):
+        object.__init__(self)
+
+        self.fReply  = reply
+        self.context = self.Context()
+
+    def emit(self, signal, *args):
+        try:
+            signal.emit(*args)
+        except RuntimeError:
+            # reply was deleted, nobody wants the response anymore
+            pass
+
+    def done(self, callback):
+        from tornado.concurrent import Future
+
+        if callback is not None:
+            callback()
+
+        future = Future()
+        future.set_result(None)
+        return future
+
+    def set_close_callback(self, callback):
+        pass
+
+    def write_headers(self, start_line, headers, chunk=None, callback=None):
+        headerList = [(name.encode("latin-1"), value.encode("latin-1")) for name, value in headers.get_all()]
+        self.emit(self.fReply.responseHead, start_line.code, start_line.reason.encode("latin-1"), headerList)
+
+        if chunk:
+            self.emit(self.fReply.responseData, bytes(chunk))
+
+        return self.done(callback)
+
+    def write(self, chunk, callback=None):
+        if chunk:
+            self.emit(self.fReply.responseData, bytes(chunk))
+
+        return self.done(callback)
+
+    def finish(self):
+        self.emit(self.fReply.responseDone)
+
+# Runs in the webserver thread
+def dispatchInProcessRequest(application, connection, method, uri, host, headers, body):
+    from tornado.httputil import HTTPHeaders, HTTPServerRequest, ResponseStartLine
+
+    try:
+        httpHeaders = HTTPHeaders()
+        for name, value in headers:
+            httpHeaders.add(name, value)
+
+        request = HTTPServerRequest(method=method, uri=uri, version="HTTP/1.0", headers=httpHeaders,
+                                    body=body, host=host, connection=connection)
+        request._parse_body()
+
+        application(request)
+
+    except Exception as e:
+        print("In-process request for '%s' failed:" % uri, e)
+        connection.write_headers(ResponseStartLine("HTTP/1.0", 500, "Internal Server Error"), HTTPHeaders())
+        connection.finish()
+
+# ------------------------------------------------------------------------------------------------------------
+# Network Access Managers
+#
+# Requests for the embedded webserver go through a unix socket (UnixSocketNetworkAccessManager), or don't leave
+# the process at all (InProcessNetworkAccessManager). Anything else goes through the regular network access.
+
+class HostNetworkAccessManager(QNetworkAccessManager):
+    def __init__(self, parent, address):
+        QNetworkAccessManager.__init__(self, parent)
+
+        self.fAddress = QUrl(address)
+
+    def createRequest(self, operation, request, outgoingData=None):
+        url = request.url()
+
+        if url.scheme() != "http" or url.host() != self.fAddress.host() or url.port() != self.fAddress.port():
+            return QNetworkAccessManager.createRequest(self, operation, request, outgoingData)
+
+        reply = self.createWebServerRequest(operation, request, outgoingData)
+
+        if reply is None:
+            return QNetworkAccessManager.createRequest(self, operation, request, outgoingData)
+
+        return reply
+
+    # Returns a reply for a request to the webserver, or None to use the regular network access
+    def createWebServerRequest(self, operation, request, outgoingData):
+        return None
+
+    def getBody(self, outgoingData):
+        return bytes(outgoingData.readAll()) if outgoingData is not None else b""
+
+    def getRequestWithCookies(self, request):
+        cookies = self.cookieJar().cookiesForUrl(request.url())
+
+        if len(cookies) == 0:
+            return request
+
+        request = QNetworkRequest(request)
+        request.setRawHeader(b"Cookie", b"; ".join(bytes(cookie.toRawForm(QNetworkCookie.NameAndValueOnly)) for cookie in cookies))
+        return request
+
+class UnixSocketNetworkAccessManager(HostNetworkAccessManager):
+    def createWebServerRequest(self, operation, request, outgoingData):
+        path = getWebServerUnixSocketPath()
+
+        if not os.path.exists(path):
+            return None
+
+        return UnixSocketReply(self, path, operation, self.getRequestWithCookies(request), self.getBody(outgoingData))
+
+class InProcessNetworkAccessManager(HostNetworkAccessManager):
+    def __init__(self, parent, address, application, htmlDir):
+        HostNetworkAccessManager.__init__(self, parent, address)
+
+        self.fApplication = application
+        self.fHtmlDir     = os.path.abspath(htmlDir)
+
+    def createWebServerRequest(self, operation, request, outgoingData):
+        if operation in (QNetworkAccessManager.GetOperation, QNetworkAccessManager.HeadOperation):
+            filename = self.getStaticFilename(request.url().path())
+
+            if filename:
+                return StaticFileReply(self, operation, request, filename)
+
+        return InProcessReply(self, operation, self.getRequestWithCookies(request), self.getBody(outgoingData), self.fApplication)
+
+    # Files in the html dir are served by the webserver as-is, except for html pages which are templates
+    def getStaticFilename(self, path):
+        if path.endswith(".html") or path.endswith("/"):
+            return ""
+
+        filename = os.path.normpath(os.path.join(self.fHtmlDir, path.lstrip("/")))
+
+        if not filename.startswith(self.fHtmlDir + os.sep) or not os.path.isfile(filename):
+            return ""
+
+        return filename
+
+# ------------------------------------------------------------------------------------------------------------
@@ -3,116 +3,204 @@
 
 # Simple script to get information from an lv2 bundle
 
-import os, lilv
+import os, sys, lilv
+
+# the bundle info cache lives in the main source dir
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
 
-# Get info from an lv2 bundle
-# @a bundle is a string, consisting of a directory in the filesystem (absolute pathname).
-def get_info_from_lv2_bundle(bundle):
-    # lilv wants the last character as the separator
-    if not bundle.endswith(os.sep):
-        bundle += os.sep
+from mod_bundlecache import getCachedBundleInfo
+
+# handy class to get lilv nodes from. copied from lv2.py in mod-ui
+class NS(object):
+    def __init__(self, world, base):
+        self.world = world
+        self.base = base
+        self._cache = {}
+
+    def __getattr__(self, attr):
+        if attr.startswith("__"):
+            raise AttributeError(attr)
+        if attr not in self._cache:
+            self._cache[attr] = lilv.Node(self.world.new_uri(self.base+attr))
+        return self._cache[attr]
+
+# Inspects lv2 bundles, one at a time, with a single long-lived lilv world.
+# Specifications, plugin classes and URI nodes are only loaded once,
+# each bundle is unloaded again after being inspected.
+class LV2BundleInspector(object):
+    def __init__(self):
+        self.world = lilv.World()
+
+        # this is needed when loading specific bundles instead of load_all
+        # (these functions are not exposed via World yet)
+        lilv.lilv_world_load_specifications(self.world.me)
+        lilv.lilv_world_load_plugin_classes(self.world.me)
+
+        # define the needed stuff
+        self.NS_lv2core       = NS(self.world, 'http://lv2plug.in/ns/lv2core#')
+        self.NS_lv2core_proto = self.NS_lv2core.prototype
+
+        self.NS_modgui       = NS(self.world, 'http://moddevices.com/ns/modgui#')
+        self.NS_modgui_thumb = self.NS_modgui.thumbnail
+
+        self.NS_ingen           = NS(self.world, 'http://drobilla.net/ns/ingen#')
+        self.NS_ingen_block     = self.NS_ingen.block
+        self.NS_ingen_prototype = self.NS_ingen.prototype
+
+    # Get info from an lv2 bundle
+    # @a bundle is a string, consisting of a directory in the filesystem (absolute pathname).
+    def inspect(self, bundle):
+        # lilv wants the last character as the separator
+        if not bundle.endswith(os.sep):
+            bundle += os.sep
+
+        # convert bundle string into a lilv node
+        bundlenode = lilv.lilv_new_file_uri(self.world.me, None, bundle)
 
-    # Create our own unique lilv world
-    # We'll load a single bundle and get all plugins from it
-    world = lilv.World()
+        # load the bundle
+        self.world.load_bundle(bundlenode)
 
-    # this is needed when loading specific bundles instead of load_all
-    # (these functions are not exposed via World yet)
-    lilv.lilv_world_load_specifications(world.me)
-    lilv.lilv_world_load_plugin_classes(world.me)
+        try:
+            return self._get_info(bundle, bundlenode)
 
-    # convert bundle string into a lilv node
-    bundlenode = lilv.lilv_new_file_uri(world.me, None, bundle)
+        finally:
+            # unload the bundle so the world only ever contains a single one
+            lilv.lilv_world_unload_bundle(self.world.me, bundlenode)
 
-    # load the bundle
-    world.load_bundle(bundlenode)
+            # free bundlenode, no longer needed
+            lilv.lilv_node_free(bundlenode)
 
-    # free bundlenode, no longer needed
-    lilv.lilv_node_free(bundlenode)
+    def _get_info(self, bundle, bundlenode):
+        world = self.world
 
-    # get all plugins in the bundle
-    plugins = world.get_all_plugins()
+        # get all plugins in the bundle
+        plugins = world.get_all_plugins()
 
-    # make sure the bundle includes 1 and only 1 plugin (the pedalboard)
-    if plugins.size() != 1:
-        raise Exception('get_info_from_lv2_bundle(%s) - bundle has 0 or > 1 plugin'.format(bundle))
+        # make sure the bundle includes 1 and only 1 plugin (the pedalboard)
+        if plugins.size() != 1:
+            raise Exception('get_info_from_lv2_bundle(%s) - bundle has 0 or > 1 plugin' % bundle)
 
-    # no indexing in python-lilv yet, just get the first item
-    plugin = None
-    for p in plugins:
-        plugin = p
-        break
+        # no indexing in python-lilv yet, just get the first item
+        plugin = None
+        for p in plugins:
+            plugin = p
+            break
 
-    if plugin is None:
-        raise Exception('get_info_from_lv2_bundle(%s) - failed to get plugin, you are using an old lilv!'.format(bundle))
+        if plugin is None:
+            raise Exception('get_info_from_lv2_bundle(%s) - failed to get plugin, you are using an old lilv!' % bundle)
 
-    # handy class to get lilv nodes from. copied from lv2.py in mod-ui
-    class NS(object):
-        def __init__(self, base):
-            self.base = base
-            self._cache = {}
+        # check if the plugin has modgui:thumnail, if not it's probably not a real pedalboard
+        thumbnail_check = plugin.get_value(self.NS_modgui_thumb).get_first()
 
-        def __getattr__(self, attr):
-            if attr not in self._cache:
-                self._cache[attr] = lilv.Node(world.new_uri(self.base+attr))
-            return self._cache[attr]
+        if thumbnail_check.me is None:
+            raise Exception('get_info_from_lv2_bundle(%s) - plugin has no modgui:thumbnail' % bundle)
 
-    # define the needed stuff
-    NS_lv2core       = NS('http://lv2plug.in/ns/lv2core#')
-    NS_lv2core_proto = NS_lv2core.prototype
+        # let's get all the info now
+        ingenplugins = []
 
-    NS_modgui       = NS('http://moddevices.com/ns/modgui#')
-    NS_modgui_thumb = NS_modgui.thumbnail
+        info = {
+            'name':      plugin.get_name().as_string(),
+            #'author':    plugin.get_author_name().as_string() or '', # Might be empty
+            #'uri':       plugin.get_uri().as_string(),
+            'thumbnail': os.path.basename(thumbnail_check.as_string()),
+            'plugins':   [] # we save this info later
+        }
 
-    NS_ingen           = NS('http://drobilla.net/ns/ingen#')
-    NS_ingen_block     = NS_ingen.block
-    NS_ingen_prototype = NS_ingen.prototype
+        blocks = plugin.get_value(self.NS_ingen_block)
 
-    # check if the plugin has modgui:thumnail, if not it's probably not a real pedalboard
-    thumbnail_check = plugin.get_value(NS_modgui_thumb).get_first()
+        it = blocks.begin()
+        while not blocks.is_end(it):
+            block = blocks.get(it)
+            it    = blocks.next(it)
 
-    if thumbnail_check.me is None:
-        raise Exception('get_info_from_lv2_bundle(%s) - plugin has no modgui:thumbnail'.format(bundle))
+            if block.me is None:
+                continue
 
-    # let's get all the info now
-    ingenplugins = []
+            protouri1 = lilv.lilv_world_get(world.me, block.me, self.NS_lv2core_proto.me, None)
+            protouri2 = lilv.lilv_world_get(world.me, block.me, self.NS_ingen_prototype.me, None)
 
-    info = {
-        'name':      plugin.get_name().as_string(),
-        #'author':    plugin.get_author_name().as_string() or '', # Might be empty
-        #'uri':       plugin.get_uri().as_string(),
-        'thumbnail': os.path.basename(thumbnail_check.as_string()),
-        'plugins':   [] # we save this info later
-    }
+            if protouri1 is not None:
+                ingenplugins.append(lilv.lilv_node_as_uri(protouri1))
+            elif protouri2 is not None:
+                ingenplugins.append(lilv.lilv_node_as_uri(protouri2))
 
-    blocks = plugin.get_value(NS_ingen_block)
+        info['plugins'] = ingenplugins
 
-    it = blocks.begin()
-    while not blocks.is_end(it):
-        block = blocks.get(it)
-        it    = blocks.next(it)
+        # the plugin description is not needed anymore, make sure it's gone before the next bundle
+        lilv.lilv_world_unload_resource(world.me, plugin.get_uri().me)
 
-        if block.me is None:
-            continue
+        return info
 
-        protouri1 = lilv.lilv_world_get(world.me, block.me, NS_lv2core_proto.me, None)
-        protouri2 = lilv.lilv_world_get(world.me, block.me, NS_ingen_prototype.me, None)
+# Shared inspector, created on first use
+_inspector = None
 
-        if protouri1 is not None:
-            ingenplugins.append(lilv.lilv_node_as_uri(protouri1))
-        elif protouri2 is not None:
-            ingenplugins.append(lilv.lilv_node_as_uri(protouri2))
+def _inspect_bundle(bundle):
+    global _inspector
 
-    info['plugins'] = ingenplugins
+    if _inspector is None:
+        _inspector = LV2BundleInspector()
 
-    return info
+    return _inspector.inspect(bundle)
+
+# Get info from an lv2 bundle
+# @a bundle is a string, consisting of a directory in the filesystem (absolute pathname).
+# Results are cached by the contents of the bundle's turtle files, unchanged bundles are not parsed again.
+def get_info_from_lv2_bundle(bundle):
+    return getCachedBundleInfo(bundle, "lv2bundleinfo", _inspect_bundle)
+
+# Find all lv2 bundles (.lv2 and .pedalboard directories) inside @a directory, recursively
+def find_lv2_bundles(directory):
+    for root, dirs, files in os.walk(directory):
+        bundles = sorted(d for d in dirs if d.endswith((".lv2", ".pedalboard")))
+
+        for bundle in bundles:
+            yield os.path.abspath(os.path.join(root, bundle))
+
+        # don't look inside bundles
+        dirs[:] = [d for d in dirs if d not in bundles]
+
+# Batch worker, each process of the pool gets its own shared inspector on first use
+def _inspect_bundle_for_batch(bundle):
+    try:
+        return { 'bundle': bundle, 'info': get_info_from_lv2_bundle(bundle) }
+    except Exception as e:
+        return { 'bundle': bundle, 'error': str(e) }
+
+# Inspect all bundles inside @a directory using @a jobs processes.
+# Results are yielded as soon as they are ready, not in any particular order.
+def inspect_lv2_bundles_parallel(directory, jobs=None):
+    from multiprocessing import Pool
+
+    pool = Pool(jobs)
+
+    try:
+        for result in pool.imap_unordered(_inspect_bundle_for_batch, find_lv2_bundles(directory), chunksize=8):
+            yield result
+    finally:
+        pool.terminate()
+        pool.join()
 
 # Test via command line
 if __name__ == '__main__':
-    import sys
+    import argparse, json
+
+    parser = argparse.ArgumentParser(description="Get information from lv2 bundles")
+    parser.add_argument("bundles", nargs="*", metavar="/path/to/bundle")
+    parser.add_argument("--batch", metavar="DIR",
+                        help="inspect all .lv2 and .pedalboard bundles inside DIR, printing one JSON object per line")
+    parser.add_argument("-j", "--jobs", type=int, default=None,
+                        help="number of worker processes for --batch (default: number of CPUs)")
+    args = parser.parse_args()
+
+    if args.batch:
+        for result in inspect_lv2_bundles_parallel(args.batch, args.jobs):
+            sys.stdout.write(json.dumps(result) + "\n")
+            sys.stdout.flush()
+        sys.exit(0)
 
-    if len(sys.argv) == 1:
-        print("usage %s /path/to/bundle" % sys.argv[0])
+    if len(args.bundles) == 0:
+        parser.print_usage()
         sys.exit(0)
 
-    print(get_info_from_lv2_bundle(sys.argv[1]))
+    for bundle in args.bundles:
+        print(get_info_from_lv2_bundle(bundle))